@@ -3,16 +3,19 @@
 # Python 3 imports
 import functools
 import time
+import weakref
 
 __all__ = (
     'cooldown',
+    'get_cooldowns',
+    'reset_cooldowns',
     )
 
 
-def _static_cooldown(cooldown):
+def _static_cooldown(cooldown, obj, *args, **kwargs):
     """Return a cooldown.
 
-    Used to convert a static integer cooldown into a function.
+    Used to convert a static number cooldown into a function.
     """
     return cooldown
 
@@ -20,15 +23,18 @@ def _static_cooldown(cooldown):
 def cooldown(cooldown, fail_callback=None):
     """Decorate a method with a cooldown.
 
-    :param int|callable cooldown:
+    :param int|float|callable cooldown:
         A static cooldown or a function for getting the cooldown
     :param callable|None fail_callback:
         A function to call if the method is still on cooldown
     """
+    if isinstance(cooldown, (int, float)):
+        cooldown_func = functools.partial(_static_cooldown, cooldown)
+    else:
+        cooldown_func = cooldown
+
     def decorator(method):
-        if isinstance(cooldown, int):
-            cooldown = functools.partial(_static_cooldown, cooldown)
-        return _UnboundMethodWrapper(method, cooldown, fail_callback)
+        return _UnboundMethodWrapper(method, cooldown_func, fail_callback)
     return decorator
 
 
@@ -50,8 +56,8 @@ class _MethodWrapper:
         :param callable|None fail_callback:
             A function to call if the method is still on cooldown
         """
+        functools.update_wrapper(self, method)
         self.method = method
-        self.__doc__ = method.__doc__
         self.cooldown_func = cooldown_func
         self.fail_callback = fail_callback
 
@@ -63,12 +69,15 @@ class _UnboundMethodWrapper(_MethodWrapper):
     accesses the method through the dot operator (``.``).
     Binds the two together using :class:`_BoundMethodWrapper` which
     handles the actual calling and cooldown of the method.
+
+    The bound wrappers, and thus the objects' cooldowns, are stored
+    with weak references to the objects, so they're freed along with
+    the objects and never mixed up with new objects.
     """
 
-    @functools.wraps(_MethodWrapper.__init__)
     def __init__(self, method, cooldown_func, fail_callback):
         super().__init__(method, cooldown_func, fail_callback)
-        self._bindings = {}
+        self._bindings = weakref.WeakKeyDictionary()
 
     def __get__(self, obj, type_=None):
         """Get a bound method wrapper for an object.
@@ -78,11 +87,13 @@ class _UnboundMethodWrapper(_MethodWrapper):
         """
         if obj is None:
             return self
-        bound = self._bindings.get(id(obj), None)
-        if bound is None:
-            bound = self._bindings[id(obj)] = _BoundMethodWrapper(
-                obj, self.method, self.cooldown_func, self.fail_callback)
-        return bound_wrapper
+        try:
+            return self._bindings[obj]
+        except KeyError:
+            pass
+        bound = self._bindings[obj] = _BoundMethodWrapper(
+            obj, self.method, self.cooldown_func, self.fail_callback)
+        return bound
 
 
 class _BoundMethodWrapper(_MethodWrapper):
@@ -90,7 +101,7 @@ class _BoundMethodWrapper(_MethodWrapper):
 
     When called, checks the cooldown situation and either calls
     the original :attr:`method` or :attr:`fail_callback` if the method
-    was still on cooldown (and :attr:`fail_callback` is not ```None``).
+    was still on cooldown (and :attr:`fail_callback` is not ``None``).
 
     Implements the :attr:`cooldown` property for getting and setting
     the methods's remaining cooldown. Also implements
@@ -99,13 +110,16 @@ class _BoundMethodWrapper(_MethodWrapper):
     and a read-only :attr:`previous_cooldown` which contains the current
     cooldown which was calculated during the previous call to the method
     (again, because the cooldown might be dynamic).
+
+    Cooldowns are measured with :func:`time.monotonic`, so they're
+    not affected by changes to the system's clock.
     """
 
     def __init__(self, obj, method, cooldown_func, fail_callback):
         """Initialize the wrapper around a method.
 
         :param object obj:
-            Object calling the method
+            Object calling the method, only weakly referenced
         :param callable method:
             Method to wrap
         :param callable cooldown_func:
@@ -113,24 +127,30 @@ class _BoundMethodWrapper(_MethodWrapper):
         :param callable|None fail_callback:
             A function to call if the method is still on cooldown
         """
-        self.obj = obj
         super().__init__(method, cooldown_func, fail_callback)
+        self._obj_ref = weakref.ref(obj)
         self._previous_cooldown = 0
         self._previous_call_time = 0
 
+    @property
+    def obj(self):
+        return self._obj_ref()
+
+    __self__ = obj
+
     @property
     def previous_cooldown(self):
         return self._previous_cooldown
 
     @property
     def cooldown(self):
-        dt = time.time() - self._last_call_time
-        return max(0, self.previous_cooldown - dt)
+        dt = time.monotonic() - self._previous_call_time
+        return max(0, self._previous_cooldown - dt)
 
     @cooldown.setter
     def cooldown(self, value):
         self._previous_cooldown = value
-        self._previous_call_time = time.time()
+        self._previous_call_time = time.monotonic()
 
     def get_max_cooldown(self, *args, **kwargs):
         """Get the method's maximum cooldown.
@@ -140,7 +160,6 @@ class _BoundMethodWrapper(_MethodWrapper):
         """
         return self.cooldown_func(self.obj, *args, **kwargs)
 
-    @functools.wraps(self.method)
     def __call__(self, *args, **kwargs):
         """Attempt to call the wrapped method.
 
@@ -148,8 +167,48 @@ class _BoundMethodWrapper(_MethodWrapper):
         (as the ``self`` argument) if the method is not on cooldown,
         or calls :attr:`fail_callback` if it is still on cooldown.
         """
-        if self.remaining_cooldown > 0:
-            self.fail_callback(self.obj, *args, **kwargs)
-        else:
-            self.cooldown = self.get_max_cooldown(*args, **kwargs)
-            self.method(self.obj, *args, **kwargs)
+        obj = self.obj
+        if self.cooldown > 0:
+            if self.fail_callback is not None:
+                return self.fail_callback(obj, *args, **kwargs)
+            return None
+        self.cooldown = self.get_max_cooldown(*args, **kwargs)
+        return self.method(obj, *args, **kwargs)
+
+
+# Names of each class's cooldown methods
+_cooldown_method_names = weakref.WeakKeyDictionary()
+
+
+def _get_cooldown_methods(obj):
+    """Get the bound wrappers of an object's cooldown methods."""
+    cls = type(obj)
+    names = _cooldown_method_names.get(cls)
+    if names is None:
+        names = _cooldown_method_names[cls] = tuple(
+            name for name in dir(cls)
+            if isinstance(
+                getattr(cls, name, None), _UnboundMethodWrapper))
+    return [(name, getattr(obj, name)) for name in names]
+
+
+def get_cooldowns(obj):
+    """Get the remaining cooldowns of all of an object's methods.
+
+    :param object obj:
+        Object whose methods' cooldowns to get
+    :returns dict:
+        Remaining cooldowns in seconds, method names as keys
+    """
+    return {name: method.cooldown
+            for name, method in _get_cooldown_methods(obj)}
+
+
+def reset_cooldowns(obj):
+    """Reset the cooldowns of all of an object's methods.
+
+    :param object obj:
+        Object whose methods' cooldowns to reset
+    """
+    for name, method in _get_cooldown_methods(obj):
+        method.cooldown = 0
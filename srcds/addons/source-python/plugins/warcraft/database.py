@@ -1,19 +1,46 @@
 """Package for the plugin's internal database classes."""
 
 # Python 3 imports
+import collections
+import concurrent.futures
+import contextlib
+import copy
 import functools
+import os
+import queue
+import threading
+import time
+import traceback
 
 __all__ = (
+    'ConnectionPool',
+    'HeroData',
+    'MemorySQLite',
     'MySQL',
+    'Prefetcher',
+    'Profile',
+    'ProfileCache',
     'SQLite',
+    'Writer',
 )
 
 
+# A player's complete data as loaded from the database, where
+# ``heroes`` is an ordered dict of ``{hero_id: HeroData}``
+Profile = collections.namedtuple(
+    'Profile', ('steamid', 'active_hero_id', 'heroes'))
+
+# A hero's data, where ``skills`` is a dict of ``{skill_id: level}``
+HeroData = collections.namedtuple('HeroData', ('level', 'xp', 'skills'))
+
+
 class _Database:
     """Wrapper class around SQL database for storing players' data.
 
     Connects to a database, and creates the tables for ``players``,
     ``heroes``, and ``skills`` if they didn't already exist.
+    The tables are then upgraded in place by running any of
+    the :attr:`_MIGRATIONS` which the database hasn't seen yet.
 
     Provides only methods directly needed by the Warcraft plugin,
     so this is not really a flexible API.
@@ -27,28 +54,131 @@ class _Database:
         :param dict \*\*kwargs:
             Keyword arguments to forward to the :meth:`_connect` method
         """
+        self._connect_args = (args, kwargs)
         self._connection = self._connect(*args, **kwargs)
-        self._connection.execute('''CREATE TABLE IF NOT EXISTS players (
-                steamid TEXT PRIMARY KEY NOT NULL,
-                active_hero_id TEXT NOT NULL
-            )''')
-        self._connection.execute('''CREATE TABLE IF NOT EXISTS heroes (
-                steamid TEXT NOT NULL,
-                class_id TEXT NOT NULL,
+        # The tables have no foreign keys, as rows are upserted with
+        # REPLACE, which deletes a parent row before reinserting it
+        with self.cursor() as cursor:
+            cursor.execute('''CREATE TABLE IF NOT EXISTS players (
+                    steamid VARCHAR(64) PRIMARY KEY NOT NULL,
+                    active_hero_id VARCHAR(255) NOT NULL
+                )''')
+            cursor.execute('''CREATE TABLE IF NOT EXISTS heroes (
+                    steamid VARCHAR(64) NOT NULL,
+                    class_id VARCHAR(255) NOT NULL,
+                    level INTEGER NOT NULL,
+                    xp INTEGER NOT NULL,
+                    PRIMARY KEY (steamid, class_id)
+                )''')
+            cursor.execute('''CREATE TABLE IF NOT EXISTS skills (
+                    steamid VARCHAR(64) NOT NULL,
+                    hero_id VARCHAR(255) NOT NULL,
+                    class_id VARCHAR(255) NOT NULL,
+                    level INTEGER NOT NULL,
+                    PRIMARY KEY (steamid, class_id)
+                )''')
+            cursor.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER NOT NULL
+                )''')
+        self._migrate()
+
+    # Migrations for upgrading the tables, one tuple of queries for
+    # each schema version. Never edit these, only append new ones.
+    _MIGRATIONS = (
+        # Version 1: Key skills by their hero, and cluster both heroes
+        # and skills by the primary keys used to load a player
+        (
+            'ALTER TABLE heroes RENAME TO _heroes_v0',
+            '''CREATE TABLE heroes (
+                steamid VARCHAR(64) NOT NULL,
+                class_id VARCHAR(255) NOT NULL,
                 level INTEGER NOT NULL,
                 xp INTEGER NOT NULL,
-                FOREIGN KEY (steamid) REFERENCES players(steamid),
                 PRIMARY KEY (steamid, class_id)
-            )''')
-        self._connection.execute('''CREATE TABLE IF NOT EXISTS skills (
-                steamid TEXT NOT NULL,
-                hero_id TEXT NOT NULL,
-                class_id TEXT NOT NULL,
+            ) WITHOUT ROWID''',
+            '''INSERT INTO heroes (steamid, class_id, level, xp)
+                SELECT steamid, class_id, level, xp FROM _heroes_v0''',
+            'DROP TABLE _heroes_v0',
+            'ALTER TABLE skills RENAME TO _skills_v0',
+            '''CREATE TABLE skills (
+                steamid VARCHAR(64) NOT NULL,
+                hero_id VARCHAR(255) NOT NULL,
+                class_id VARCHAR(255) NOT NULL,
                 level INTEGER NOT NULL,
-                FOREIGN KEY (steamid) REFERENCES players(steamid),
-                FOREIGN KEY (hero_id) REFERENCES heroes(class_id),
-                PRIMARY KEY (steamid, class_id)
-            )''')
+                PRIMARY KEY (steamid, hero_id, class_id)
+            ) WITHOUT ROWID''',
+            '''INSERT INTO skills (steamid, hero_id, class_id, level)
+                SELECT steamid, hero_id, class_id, level FROM _skills_v0''',
+            'DROP TABLE _skills_v0',
+        ),
+    )
+
+    def _migrate(self):
+        """Run any migrations newer than the database's schema version.
+
+        Each migration is run in a single :meth:`_transaction` along
+        with the update of the schema version, so a failed migration
+        leaves the database as it was and is run again on the next start.
+
+        Reports how long each query took, as well as how long loading
+        a player took before and after the migrations.
+        """
+        with self.cursor() as cursor:
+            cursor.execute('SELECT version FROM schema_version')
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('INSERT INTO schema_version VALUES (0)')
+                version = 0
+            else:
+                version = row[0]
+            cursor.execute('SELECT steamid FROM players LIMIT 1')
+            row = cursor.fetchone()
+        self.commit()
+        if version >= len(self._MIGRATIONS):
+            return
+        steamid = row[0] if row is not None else ''
+        print('[Warcraft] Migrating database from schema version {0} to {1}'
+            .format(version, len(self._MIGRATIONS)))
+        before = self._time_profile_query(steamid)
+        for version, queries in enumerate(
+                self._MIGRATIONS[version:], start=version + 1):
+            with self._transaction(), self.cursor() as cursor:
+                for query in queries:
+                    duration = self._time_query(query, cursor=cursor)
+                    print('[Warcraft]   {0:8.3f} ms  {1}'.format(
+                        duration * 1000, query.split('\n')[0]))
+                cursor.execute(
+                    self._prepare('UPDATE schema_version SET version=?'),
+                    (version,))
+        after = self._time_profile_query(steamid)
+        print('[Warcraft] Loading a player took {0:.3f} ms before '
+            'and {1:.3f} ms after the migration'.format(
+                before * 1000, after * 1000))
+
+    def _time_profile_query(self, steamid, repeat=5):
+        """Return the best time of loading a player's profile."""
+        return min(
+            self._time_query(self._PROFILE_QUERY, (steamid,))
+            for _ in range(repeat))
+
+    def _time_query(self, query, args=(), *, cursor=None):
+        """Execute a query and return how long it took in seconds."""
+        if cursor is None:
+            with self.cursor() as cursor:
+                return self._time_query(query, args, cursor=cursor)
+        start_time = time.perf_counter()
+        cursor.execute(self._prepare(query), args)
+        cursor.fetchall()
+        return time.perf_counter() - start_time
+
+    def clone(self):
+        """Open a new connection to the same database.
+
+        Database connections shouldn't be shared between threads,
+        so any thread other than the main thread should use a clone.
+        """
+        args, kwargs = self._connect_args
+        return type(self)(*args, **kwargs)
 
     def close(self):
         """Close the connection to the database."""
@@ -58,6 +188,32 @@ class _Database:
         """Commit changes to the database."""
         self._connection.commit()
 
+    def rollback(self):
+        """Roll back any uncommitted changes."""
+        self._connection.rollback()
+
+    def persist(self):
+        """Make sure the committed changes are stored on disk.
+
+        Committing already stores them for databases on disk,
+        so this only needs to be overridden by in-memory databases.
+        """
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Commit the queries of a block, or roll them back on error.
+
+        MySQL commits implicitly after schema changes, so only the rest
+        of the queries can be rolled back, unless a subclass overrides
+        this with a truly transactional implementation.
+        """
+        try:
+            yield
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
     def _connect(self, *args, **kwargs):
         """Connect to the database.
 
@@ -74,43 +230,55 @@ class _Database:
         """
         raise NotImplementedError
 
-    def get_active_hero_id(self, steamid):
-        """Get a player's active hero's :attr:`class_id` (or ``None``).
+    def _prepare(self, query):
+        """Convert a query into the database's own SQL dialect.
 
-        :param str steamid:
-            SteamID of the player whose active hero to get
+        All of the queries are written in SQLite's dialect, so this
+        needs to be overridden by subclasses using a different dialect.
         """
-        sql = 'SELECT active_hero_id FROM players WHERE steamid=?'
-        with self.cursor() as cursor:
-            cursor.execute(sql, (steamid,))
-            data = cursor.fetchone()
-            if data:
-                return data[0]
-            return None
+        return query
 
-    def get_heroes_data(self, steamid):
-        """Get every hero's data for a player.
+    # Joins from the SteamID itself, so the players row is found even
+    # if there are no heroes rows, and vice versa
+    _PROFILE_QUERY = '''SELECT h.class_id, h.level, h.xp, s.class_id, s.level,
+            p.active_hero_id
+        FROM (SELECT ? AS steamid) AS k
+        LEFT JOIN players AS p
+            ON p.steamid = k.steamid
+        LEFT JOIN heroes AS h
+            ON h.steamid = k.steamid
+        LEFT JOIN skills AS s
+            ON s.steamid = h.steamid AND s.hero_id = h.class_id'''
 
-        :param str steamid:
-            SteamID of the player whose heroes' data to get
-        """
-        sql = 'SELECT class_id, level, xp FROM heroes WHERE steamid=?'
-        with self.cursor() as cursor:
-            cursor.execute(sql, (steamid,))
-            return cursor.fetchall()
+    def load_profile(self, steamid):
+        """Load a player's active hero, heroes, and skills at once.
 
-    def get_skills_data(self, steamid, hero_id):
-        """Get every skill's data for a hero.
+        Fetches everything with a single joined query, so the cost of
+        loading a player doesn't grow with the number of his heroes.
 
         :param str steamid:
-            SteamID of the player who owns the hero
-        :param str hero_id:
-            ``class_id`` of the hero who owns the skills
+            SteamID of the player whose profile to load
+        :returns Profile:
+            The player's profile, with no heroes if he's a new player
         """
-        sql = 'SELECT class_id, level FROM skills WHERE steamid=? AND hero_id=?'
+        return self._read_profile(self._PROFILE_QUERY, steamid)
+
+    def _read_profile(self, query, steamid):
+        """Read a player's profile with a query like :attr:`_PROFILE_QUERY`."""
+        active_hero_id = None
+        heroes = collections.OrderedDict()
         with self.cursor() as cursor:
-            cursor.execute(sql, (steamid, hero_id))
-            return cursor.fetchall()
+            cursor.execute(self._prepare(query), (steamid,))
+            for hero_id, level, xp, skill_id, skill_level, active_id in cursor:
+                active_hero_id = active_id
+                if hero_id is None:
+                    continue
+                hero_data = heroes.get(hero_id)
+                if hero_data is None:
+                    hero_data = heroes[hero_id] = HeroData(level, xp, {})
+                if skill_id is not None:
+                    hero_data.skills[skill_id] = skill_level
+        return Profile(steamid, active_hero_id, heroes)
 
     def _save_individual_data(self, query, individual_data):
         """Save individual data into the database.
@@ -123,7 +291,7 @@ class _Database:
             Individual data to insert to the database
         """
         with self.cursor() as cursor:
-            cursor.execute(query, individual_data)
+            cursor.execute(self._prepare(query), individual_data)
 
     def _save_multiple_data(self, query, multiple_data):
         """Save multiple data into the database.
@@ -136,7 +304,7 @@ class _Database:
             Iterable of multiple datas to insert to the database
         """
         with self.cursor() as cursor:
-            cursor.executemany(query, multiple_data)
+            cursor.executemany(self._prepare(query), multiple_data)
 
     _PLAYER_QUERY = 'INSERT OR REPLACE INTO players VALUES (?, ?)'
     save_player = functools.partialmethod(_save_individual_data, _PLAYER_QUERY)
@@ -150,16 +318,738 @@ class _Database:
     save_skill = functools.partialmethod(_save_individual_data, _SKILL_QUERY)
     save_skills = functools.partialmethod(_save_multiple_data, _SKILL_QUERY)
 
+    def save_data(self, players_data, heroes_data, skills_data):
+        """Save rows into all of the tables and commit them at once.
+
+        Every row is saved with ``INSERT OR REPLACE``, so the whole
+        transaction can safely be retried if it fails midway.
+
+        :param iterable players_data:
+            Rows for the ``players`` table
+        :param iterable heroes_data:
+            Rows for the ``heroes`` table
+        :param iterable skills_data:
+            Rows for the ``skills`` table
+        """
+        self.save_players(players_data)
+        self.save_heroes(heroes_data)
+        self.save_skills(skills_data)
+        self.commit()
+
+    # Columns of each table, with the tables in their dependency order
+    TABLE_COLUMNS = collections.OrderedDict((
+        ('players', ('steamid', 'active_hero_id')),
+        ('heroes', ('steamid', 'class_id', 'level', 'xp')),
+        ('skills', ('steamid', 'hero_id', 'class_id', 'level')),
+    ))
+
+    def stream_cursor(self):
+        """Return a cursor which doesn't buffer the whole result set.
+
+        Defaults to :meth:`cursor`, which needs to be overridden by
+        subclasses whose default cursors fetch every row at once.
+        """
+        return self.cursor()
+
+    def iter_rows(self, table, chunk_size=10000):
+        """Yield every row of a table without loading it all at once.
+
+        :param str table:
+            Name of the table, a key of :attr:`TABLE_COLUMNS`
+        :param int chunk_size:
+            Amount of rows to fetch from the database at a time
+        """
+        query = 'SELECT {0} FROM {1}'.format(
+            ', '.join(self.TABLE_COLUMNS[table]), table)
+        with self.stream_cursor() as cursor:
+            cursor.execute(query)
+            rows = cursor.fetchmany(chunk_size)
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(chunk_size)
+
+    def save_rows(self, table, rows):
+        """Save multiple rows into a table by the table's name.
+
+        :param str table:
+            Name of the table, a key of :attr:`TABLE_COLUMNS`
+        :param iterable rows:
+            Rows to save, with values in the order of the table's columns
+        """
+        if table not in self.TABLE_COLUMNS:
+            raise ValueError("Unknown table '{0}'.".format(table))
+        getattr(self, 'save_' + table)(rows)
+
+
+class Writer:
+    """Background thread for writing players' data into a database.
+
+    Players' data is :meth:`put` onto a bounded queue as serialized
+    rows, and a dedicated thread takes the rows out of the queue and
+    writes them into a clone of the database. Everything found from
+    the queue at once is coalesced into a single transaction, where
+    only the most recent row for each primary key gets written,
+    so the last write for a player always wins.
+
+    If a transaction fails, its data is kept and written again along
+    with any newer data, after a delay which doubles on every failure
+    from ``retry_delay`` up to ``max_retry_delay`` seconds. Functions
+    queued with :meth:`call` wait for the data queued before them.
+    Data is only given up on if it still fails after :meth:`close`.
+
+    If the queue is full, :meth:`put` blocks until the thread catches
+    up. This backpressure is recorded into the following attributes:
+
+    - ``max_queue_size``: Largest amount of items seen in the queue
+    - ``blocked_puts``: How many times :meth:`put` had to block
+    - ``blocked_time``: Total seconds spent blocking in :meth:`put`
+
+    Other statistics available are ``transactions``, ``rows_written``,
+    ``rows_coalesced``, ``failed_transactions``, and ``write_time``.
+    """
+
+    def __init__(self, database, max_size=1024, batch_size=256,
+                 retry_delay=1, max_retry_delay=60):
+        """Initialize the writer and start its thread.
+
+        :param _Database database:
+            Database whose clone to write the data into
+        :param int max_size:
+            Maximum amount of items in the queue before :meth:`put` blocks
+        :param int batch_size:
+            Maximum amount of items to take from the queue at once
+        :param float retry_delay:
+            Seconds to wait before writing failed data again
+        :param float max_retry_delay:
+            Maximum seconds to wait between writing failed data again
+        """
+        self._database = database
+        self._queue = queue.Queue(max_size)
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._pending = collections.Counter()
+        self._pending_rows = {}
+        self._pending_lock = threading.Lock()
+        self.max_queue_size = 0
+        self.blocked_puts = 0
+        self.blocked_time = 0.0
+        self.transactions = 0
+        self.failed_transactions = 0
+        self.rows_written = 0
+        self.rows_coalesced = 0
+        self.write_time = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name='warcraft-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, steamid, players_data, heroes_data, skills_data):
+        """Queue a player's data to be written into the database.
+
+        :param str steamid:
+            SteamID of the player whose data it is
+        :param iterable players_data:
+            Rows for the ``players`` table
+        :param iterable heroes_data:
+            Rows for the ``heroes`` table
+        :param iterable skills_data:
+            Rows for the ``skills`` table
+        """
+        item = (steamid, tuple(players_data),
+                tuple(heroes_data), tuple(skills_data))
+        with self._pending_lock:
+            self._pending[steamid] += 1
+            rows = self._pending_rows.get(steamid)
+            if rows is None:
+                rows = self._pending_rows[steamid] = (
+                    collections.OrderedDict(), collections.OrderedDict(),
+                    collections.OrderedDict())
+            for row in item[1]:
+                rows[0][row[0]] = row
+            for row in item[2]:
+                rows[1][row[:2]] = row
+            for row in item[3]:
+                rows[2][row[:3]] = row
+        self._put(item)
+
+    def call(self, function):
+        """Queue a function to be called on the writer's thread.
+
+        The function is called with the writer's database as its only
+        argument, after all of the data queued before it has been
+        written and committed.
+
+        :param callable function:
+            Function to call on the writer's thread
+        """
+        self._put(function)
+
+    def _put(self, item):
+        """Put an item onto the queue, recording any backpressure."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            start_time = time.perf_counter()
+            self._queue.put(item)
+            self.blocked_puts += 1
+            self.blocked_time += time.perf_counter() - start_time
+        self.max_queue_size = max(self.max_queue_size, self._queue.qsize())
+
+    def has_pending(self, steamid):
+        """Check if a player has data which hasn't been written yet."""
+        with self._pending_lock:
+            return self._pending[steamid] > 0
+
+    def load_profile(self, database, steamid):
+        """Load a player's profile with his pending data applied.
+
+        Data which hasn't been written yet, e.g. because writing it has
+        failed, is newer than the database's, so it's applied on top of
+        the profile loaded from the database. The pending data is taken
+        before loading, so data which gets written meanwhile is not
+        missed either.
+
+        :param _Database database:
+            Database to load the profile from
+        :param str steamid:
+            SteamID of the player whose profile to load
+        :returns Profile:
+            The player's most recent profile
+        """
+        with self._pending_lock:
+            rows = self._pending_rows.get(steamid)
+            if rows is not None:
+                players_data, heroes_data, skills_data = (
+                    list(rows[0].values()), list(rows[1].values()),
+                    list(rows[2].values()))
+        profile = database.load_profile(steamid)
+        if rows is None:
+            return profile
+        active_hero_id = profile.active_hero_id
+        for steamid, hero_id in players_data:
+            active_hero_id = hero_id
+        heroes = collections.OrderedDict(profile.heroes)
+        for steamid, hero_id, level, xp in heroes_data:
+            skills = heroes[hero_id].skills if hero_id in heroes else {}
+            heroes[hero_id] = HeroData(level, xp, skills)
+        for steamid, hero_id, skill_id, level in skills_data:
+            if hero_id not in heroes:
+                heroes[hero_id] = HeroData(0, 0, {})
+            heroes[hero_id].skills[skill_id] = level
+        return Profile(profile.steamid, active_hero_id, heroes)
+
+    def flush(self):
+        """Block until all of the queued data has been written.
+
+        Doesn't wait for data which has failed to be written, so that
+        a lost database can't block the caller. The data is retried
+        later, and :meth:`has_pending` is true until it's written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """Write all of the queued data and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        """Write data from the queue until :meth:`close` is called."""
+        database = self._database.clone()
+        backlog = []
+        retry_delay = 0
+        retry_time = None
+        try:
+            running = True
+            while running:
+                if retry_time is None:
+                    items = self._get_items(None)
+                else:
+                    items = self._get_items(
+                        max(0, retry_time - time.monotonic()))
+                running = not items or items[-1] is not None
+                backlog.extend(items if running else items[:-1])
+                if (retry_time is None or not running
+                        or time.monotonic() >= retry_time):
+                    backlog = self._process(database, backlog)
+                    if not backlog:
+                        retry_delay = 0
+                        retry_time = None
+                    elif running:
+                        retry_delay = min(
+                            max(retry_delay * 2, self.retry_delay),
+                            self.max_retry_delay)
+                        retry_time = time.monotonic() + retry_delay
+                    else:
+                        self._give_up(backlog)
+                for _ in items:
+                    self._queue.task_done()
+        finally:
+            database.close()
+
+    def _get_items(self, timeout):
+        """Take up to :attr:`batch_size` items from the queue.
+
+        Waits for the first item for ``timeout`` seconds, or forever
+        if it's ``None``, and returns no items if none arrived.
+        """
+        try:
+            items = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while items[-1] is not None and len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _process(self, database, backlog):
+        """Write the data and call the functions of a backlog in order.
+
+        :returns list:
+            Items of the backlog left to retry, starting from the data
+            which failed to be written
+        """
+        data = []
+        for index, item in enumerate(backlog):
+            if not callable(item):
+                data.append(item)
+                continue
+            if data and not self._write(database, data):
+                return data + backlog[index:]
+            data = []
+            try:
+                item(database)
+            except Exception:
+                traceback.print_exc()
+        if data and not self._write(database, data):
+            return data
+        return []
+
+    def _give_up(self, backlog):
+        """Drop a backlog which couldn't be written before closing."""
+        data = [item for item in backlog if not callable(item)]
+        print('[Warcraft] Failed to write the data of {0} saves'.format(
+            len(data)))
+        self._done(data)
+
+    def _done(self, items):
+        """Mark items' data as no longer pending."""
+        with self._pending_lock:
+            for item in items:
+                self._pending[item[0]] -= 1
+                if self._pending[item[0]] <= 0:
+                    del self._pending[item[0]]
+                    del self._pending_rows[item[0]]
+
+    def _write(self, database, items):
+        """Coalesce items and write them in a single transaction.
+
+        :returns bool:
+            ``True`` if the transaction was committed
+        """
+        players = collections.OrderedDict()
+        heroes = collections.OrderedDict()
+        skills = collections.OrderedDict()
+        row_count = 0
+        for steamid, players_data, heroes_data, skills_data in items:
+            for row in players_data:
+                players[row[0]] = row
+            for row in heroes_data:
+                heroes[row[:2]] = row
+            for row in skills_data:
+                skills[row[:3]] = row
+            row_count += len(players_data) + len(heroes_data) + len(skills_data)
+        start_time = time.perf_counter()
+        try:
+            database.save_data(
+                players.values(), heroes.values(), skills.values())
+        except Exception:
+            self.failed_transactions += 1
+            traceback.print_exc()
+            with contextlib.suppress(Exception):
+                database.rollback()
+            return False
+        else:
+            self.transactions += 1
+            written_count = len(players) + len(heroes) + len(skills)
+            self.rows_written += written_count
+            self.rows_coalesced += row_count - written_count
+            self._done(items)
+            return True
+        finally:
+            self.write_time += time.perf_counter() - start_time
+
+
+class Prefetcher:
+    """Background thread for loading players' profiles in advance.
+
+    Profiles are requested with :meth:`prefetch` as soon as a player's
+    SteamID is known, and loaded on a worker thread using its own clone
+    of the database. When the player's data is actually needed, it can
+    be picked up with :meth:`get` which waits for a bounded time.
+
+    Keeps count of ``hits``, ``misses``, and ``timeouts`` of the gets.
+    """
+
+    def __init__(self, database, writer=None, timeout=0.1):
+        """Initialize the prefetcher and its worker thread.
+
+        :param _Database database:
+            Database whose clone to load the profiles from
+        :param Writer|None writer:
+            Writer whose pending data to apply onto the loaded profiles
+        :param float timeout:
+            Seconds for :meth:`get` to wait for an unfinished prefetch
+        """
+        self._database = database
+        self._writer = writer
+        self.timeout = timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._worker_database = None
+        self._futures = {}
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+
+    def prefetch(self, steamid):
+        """Start loading a player's profile on the worker thread."""
+        if steamid not in self._futures:
+            self._futures[steamid] = self._executor.submit(
+                self._load_profile, steamid)
+
+    def discard(self, steamid):
+        """Forget a player's prefetched profile, if any."""
+        future = self._futures.pop(steamid, None)
+        if future is not None:
+            future.cancel()
+
+    def get(self, steamid):
+        """Get a player's prefetched profile.
+
+        Returns ``None`` if the profile wasn't prefetched, if it didn't
+        finish loading in time, or if the player has got new data in
+        the writer's queue since, in which case it should be loaded
+        from the database directly instead.
+
+        :param str steamid:
+            SteamID of the player whose profile to get
+        :returns Profile|None:
+            The player's prefetched profile
+        """
+        future = self._futures.pop(steamid, None)
+        if future is None:
+            self.misses += 1
+            return None
+        try:
+            profile = future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            return None
+        except Exception:
+            traceback.print_exc()
+            self.misses += 1
+            return None
+        if self._writer is not None and self._writer.has_pending(steamid):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return profile
+
+    def close(self):
+        """Stop the worker thread and close its database."""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.submit(self._close_database)
+        self._executor.shutdown(wait=True)
+
+    def _load_profile(self, steamid):
+        """Load a profile, called on the worker thread."""
+        if self._worker_database is None:
+            self._worker_database = self._database.clone()
+        if self._writer is not None:
+            return self._writer.load_profile(self._worker_database, steamid)
+        return self._worker_database.load_profile(steamid)
+
+    def _close_database(self):
+        """Close the worker's database, called on the worker thread."""
+        if self._worker_database is not None:
+            self._worker_database.close()
+            self._worker_database = None
+
+
+class ProfileCache:
+    """Size and age bounded LRU cache of departed players' profiles.
+
+    Keeps the profiles of recently disconnected players in memory so
+    that they don't need to be loaded from the database if they join
+    back soon, e.g. after a map change or a timeout.
+
+    A profile is only ever evicted after the player's data has been
+    written into the database by the :class:`Writer`. Profiles whose
+    data is still pending are kept, even beyond ``max_size``, and are
+    evicted on a later :meth:`evict` once their data has been written.
+
+    Keeps count of ``hits``, ``misses``, and ``evictions``.
+    """
+
+    def __init__(self, writer, max_size=256, max_age=1800):
+        """Initialize the cache.
+
+        :param Writer writer:
+            Writer which is used for saving the players' data
+        :param int max_size:
+            Maximum amount of profiles to keep in the cache
+        :param float max_age:
+            Maximum amount of seconds to keep a profile in the cache
+        """
+        self._writer = writer
+        self.max_size = max_size
+        self.max_age = max_age
+        self._profiles = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, steamid):
+        return steamid in self._profiles
+
+    def __len__(self):
+        return len(self._profiles)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def put(self, profile):
+        """Store a departed player's profile as the most recent one."""
+        self._profiles.pop(profile.steamid, None)
+        self._profiles[profile.steamid] = (time.monotonic(), profile)
+        self.evict()
+
+    def get(self, steamid):
+        """Take a player's profile out of the cache.
+
+        The profile is removed from the cache, as the player's own
+        data will be more recent from now on.
+
+        :param str steamid:
+            SteamID of the player whose profile to get
+        :returns Profile|None:
+            The player's profile or ``None`` if it wasn't cached
+        """
+        self.evict()
+        entry = self._profiles.pop(steamid, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def evict(self):
+        """Evict the profiles which are too old or don't fit anymore.
+
+        Never waits for the writer, profiles with pending data are
+        skipped instead.
+        """
+        now = time.monotonic()
+        excess = len(self._profiles) - self.max_size
+        evicted = []
+        for steamid, (stored_time, profile) in self._profiles.items():
+            if len(evicted) >= excess and now - stored_time < self.max_age:
+                break
+            if not self._writer.has_pending(steamid):
+                evicted.append(steamid)
+        for steamid in evicted:
+            del self._profiles[steamid]
+        self.evictions += len(evicted)
+
+
+class ConnectionPool:
+    """Pool of DB-API connections, giving each thread its own connection.
+
+    Acts like a single DB-API connection whose :meth:`cursor`,
+    :meth:`commit`, and :meth:`rollback` methods are forwarded to
+    the calling thread's own connection. Threads take a connection
+    from the pool's idle connections (or open a new one) on first use,
+    and give it back with :meth:`release`.
+
+    Connections which have been idle for longer than ``ping_interval``
+    seconds are health checked before use, and reconnected if they
+    have been dropped, e.g. by MySQL's ``wait_timeout``.
+    """
+
+    def __init__(self, connect, errors=(), max_idle=4, ping_interval=60):
+        """Initialize the pool.
+
+        :param callable connect:
+            Function for opening a new connection
+        :param tuple errors:
+            Exception classes which mean that a connection was lost
+        :param int max_idle:
+            Maximum amount of idle connections to keep open
+        :param float ping_interval:
+            Seconds of idling after which a connection is health checked
+        """
+        self._connect = connect
+        self.errors = tuple(errors)
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def connection(self):
+        """Get the calling thread's connection, checking its health."""
+        now = time.monotonic()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            with self._lock:
+                idle = self._idle.pop() if self._idle else None
+            if idle is None:
+                idle = (self._connect(), now, {})
+            (self._local.connection, self._local.last_used,
+                self._local.statements) = idle
+            connection = self._local.connection
+        if (now - self._local.last_used >= self.ping_interval
+                and not self._is_alive(connection)):
+            self.discard()
+            return self.connection()
+        self._local.last_used = now
+        return connection
+
+    def statements(self):
+        """Get the prepared statements cache of the thread's connection."""
+        self.connection()
+        return self._local.statements
+
+    def _is_alive(self, connection):
+        """Check if a connection is alive, reconnecting if possible."""
+        try:
+            if hasattr(connection, 'ping'):
+                connection.ping(True)
+            else:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchall()
+                finally:
+                    cursor.close()
+        except self.errors:
+            return False
+        return True
+
+    def cursor(self, *args, **kwargs):
+        return self.connection().cursor(*args, **kwargs)
+
+    def commit(self):
+        self.connection().commit()
+
+    def rollback(self):
+        self.connection().rollback()
+
+    def release(self):
+        """Give the calling thread's connection back to the pool."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((
+                    connection, self._local.last_used, self._local.statements))
+                return
+        connection.close()
+
+    def discard(self):
+        """Close the calling thread's connection without reusing it."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+        self._local.connection = None
+        with contextlib.suppress(Exception):
+            connection.close()
+
+    def close(self):
+        """Close the calling thread's connection and all idle ones."""
+        self.discard()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, last_used, statements in idle:
+            with contextlib.suppress(Exception):
+                connection.close()
+
 
 class MySQL(_Database):
-    """Database class which uses :module:`pymysql` for connecting."""
+    """Database class which uses :module:`pymysql` for connecting.
+
+    Connects through a :class:`ConnectionPool`, so that every thread
+    (and thus every clone) uses its own connection, and dropped
+    connections are transparently reconnected. Loading profiles and
+    saving data are retried up to :attr:`retries` times if
+    the connection is lost, as both are idempotent.
+    """
+
+    retries = 2
+    _is_clone = False
 
     def _connect(self, *args, **kwargs):
         import pymysql
-        return pymysql.connection(*args, **kwargs)
+        return ConnectionPool(
+            functools.partial(pymysql.connect, *args, **kwargs),
+            errors=(pymysql.err.OperationalError, pymysql.err.InterfaceError))
 
     def cursor(self):
-        return self._connection.cursor
+        return self._connection.cursor()
+
+    def stream_cursor(self):
+        import pymysql.cursors
+        return self._connection.cursor(pymysql.cursors.SSCursor)
+
+    def clone(self):
+        clone = copy.copy(self)
+        clone._is_clone = True
+        return clone
+
+    def close(self):
+        """Release the thread's connection, or close the whole pool.
+
+        Clones only give their thread's connection back to the pool,
+        while the original closes every connection of the pool.
+        """
+        if self._is_clone:
+            self._connection.release()
+        else:
+            self._connection.close()
+
+    def _prepare(self, query):
+        statements = self._connection.statements()
+        statement = statements.get(query)
+        if statement is None:
+            statement = query.replace('INSERT OR REPLACE', 'REPLACE')
+            statement = statement.replace(' WITHOUT ROWID', '')
+            statement = statements[query] = statement.replace('?', '%s')
+        return statement
+
+    def _retry(self, method, *args):
+        """Call a method, retrying it on a new connection if needed."""
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args)
+            except self._connection.errors:
+                self._connection.discard()
+                if attempt == self.retries:
+                    raise
+
+    def load_profile(self, steamid):
+        return self._retry(super().load_profile, steamid)
+
+    def save_data(self, players_data, heroes_data, skills_data):
+        return self._retry(
+            super().save_data, players_data, heroes_data, skills_data)
 
 
 class SQLite(_Database):
@@ -167,8 +1057,253 @@ class SQLite(_Database):
 
     def _connect(self, *args, **kwargs):
         import sqlite3
-        return sqlite3.connect(*args, **kwargs)
+        connection = sqlite3.connect(*args, **kwargs)
+        # Let the main thread read while the writer thread is writing
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
 
     def cursor(self):
-        import contextlib
         return contextlib.closing(self._connection.cursor())
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # The sqlite3 module only begins transactions implicitly before
+        # modifying rows, so schema changes would be committed at once
+        isolation_level = self._connection.isolation_level
+        self._connection.isolation_level = None
+        try:
+            self._connection.execute('BEGIN')
+            try:
+                yield
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+        finally:
+            self._connection.isolation_level = isolation_level
+
+
+class MemorySQLite(SQLite):
+    """SQLite database which keeps recently used players' data in memory.
+
+    The database file is used just like with :class:`SQLite`, but an
+    in-memory database is attached to it as a hot tier. A player's rows
+    are copied into the hot tier when his profile is first loaded or
+    his data first saved, after which both only touch the memory.
+
+    The rows of the players whose data has changed are periodically
+    persisted, i.e. written back into the file, after which players
+    who haven't been used for ``hot_age`` seconds are dropped from
+    the hot tier. Persisting thus only costs as much as the changed
+    players' rows, no matter how large the database file has grown.
+
+    Durability is configured with ``persist_interval``, the amount of
+    seconds of changes which can be lost if the server crashes.
+    :meth:`persist` can also be called manually at any time.
+
+    Clones share the same connection with the original, guarded by
+    a lock, so the connection can be used from any thread.
+    """
+
+    # Tables of the hot tier, with the same columns and keys as the file's
+    _HOT_TABLES = (
+        '''CREATE TABLE hot.players (
+            steamid VARCHAR(64) PRIMARY KEY NOT NULL,
+            active_hero_id VARCHAR(255) NOT NULL
+        )''',
+        '''CREATE TABLE hot.heroes (
+            steamid VARCHAR(64) NOT NULL,
+            class_id VARCHAR(255) NOT NULL,
+            level INTEGER NOT NULL,
+            xp INTEGER NOT NULL,
+            PRIMARY KEY (steamid, class_id)
+        ) WITHOUT ROWID''',
+        '''CREATE TABLE hot.skills (
+            steamid VARCHAR(64) NOT NULL,
+            hero_id VARCHAR(255) NOT NULL,
+            class_id VARCHAR(255) NOT NULL,
+            level INTEGER NOT NULL,
+            PRIMARY KEY (steamid, hero_id, class_id)
+        ) WITHOUT ROWID''',
+    )
+
+    _HOT_PROFILE_QUERY = '''SELECT h.class_id, h.level, h.xp, s.class_id,
+            s.level, p.active_hero_id
+        FROM (SELECT ? AS steamid) AS k
+        LEFT JOIN hot.players AS p
+            ON p.steamid = k.steamid
+        LEFT JOIN hot.heroes AS h
+            ON h.steamid = k.steamid
+        LEFT JOIN hot.skills AS s
+            ON s.steamid = h.steamid AND s.hero_id = h.class_id'''
+
+    def __init__(self, path, persist_interval=60, hot_age=1800):
+        """Open the database file and attach the hot tier to it.
+
+        :param str path:
+            Path to the database file
+        :param float|None persist_interval:
+            Seconds between persisting the changes into the file,
+            or ``None`` to only persist when closing the database
+        :param float hot_age:
+            Seconds to keep an unused player's rows in the hot tier
+        """
+        self.path = str(path)
+        self.persist_interval = persist_interval
+        self.hot_age = hot_age
+        self._lock = threading.RLock()
+        self._is_clone = False
+        self._hot = {}
+        self._dirty = set()
+        super().__init__(self.path)
+        self._stop_persisting = threading.Event()
+        self._persist_thread = None
+        if persist_interval is not None:
+            self._persist_thread = threading.Thread(
+                target=self._persist_periodically,
+                name='warcraft-persist', daemon=True)
+            self._persist_thread.start()
+
+    def _connect(self, path):
+        connection = super()._connect(path, check_same_thread=False)
+        connection.execute("ATTACH DATABASE ':memory:' AS hot")
+        for query in self._HOT_TABLES:
+            connection.execute(query)
+        return connection
+
+    @contextlib.contextmanager
+    def cursor(self):
+        with self._lock:
+            cursor = self._connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def commit(self):
+        with self._lock:
+            self._connection.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._connection.rollback()
+
+    def clone(self):
+        clone = copy.copy(self)
+        clone._is_clone = True
+        return clone
+
+    def close(self):
+        """Persist the changes and close the connection.
+
+        Does nothing for clones, the original owns the connection.
+        """
+        if self._is_clone:
+            return
+        self._stop_persisting.set()
+        if self._persist_thread is not None:
+            self._persist_thread.join()
+        self.persist()
+        self._connection.close()
+
+    def _heat(self, steamids):
+        """Copy players' rows from the file into the hot tier.
+
+        Only copies the players who aren't in the hot tier already,
+        and doesn't commit.
+
+        :returns list:
+            SteamIDs of the players whose rows were copied
+        """
+        steamids = [
+            steamid for steamid in set(steamids) if steamid not in self._hot]
+        if not steamids:
+            return steamids
+        with self.cursor() as cursor:
+            for table, columns in self.TABLE_COLUMNS.items():
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO hot.{0} SELECT {1} FROM main.{0} '
+                    'WHERE steamid=?'.format(table, ', '.join(columns)),
+                    ((steamid,) for steamid in steamids))
+        return steamids
+
+    def _touch(self, steamids):
+        """Mark players as used now, keeping them in the hot tier."""
+        now = time.monotonic()
+        for steamid in steamids:
+            self._hot[steamid] = now
+
+    def load_profile(self, steamid):
+        with self._lock:
+            try:
+                self._heat((steamid,))
+                self.commit()
+            except Exception:
+                self.rollback()
+                raise
+            self._touch((steamid,))
+            return self._read_profile(self._HOT_PROFILE_QUERY, steamid)
+
+    def save_data(self, players_data, heroes_data, skills_data):
+        """Save rows into the hot tier and commit them at once.
+
+        The rows are written into the file by the next :meth:`persist`.
+        """
+        data = (list(players_data), list(heroes_data), list(skills_data))
+        steamids = {row[0] for rows in data for row in rows}
+        with self._lock:
+            try:
+                self._heat(steamids)
+                with self.cursor() as cursor:
+                    for (table, columns), rows in zip(
+                            self.TABLE_COLUMNS.items(), data):
+                        query = 'INSERT OR REPLACE INTO hot.{0} VALUES ({1})'
+                        cursor.executemany(
+                            query.format(table, ', '.join('?' * len(columns))),
+                            rows)
+                self.commit()
+            except Exception:
+                self.rollback()
+                raise
+            self._touch(steamids)
+            self._dirty.update(steamids)
+
+    def persist(self):
+        """Write the changed players' rows from memory into the file.
+
+        Afterwards drops the players who haven't been used for
+        :attr:`hot_age` seconds from the hot tier.
+        """
+        with self._lock:
+            now = time.monotonic()
+            dirty = [(steamid,) for steamid in self._dirty]
+            cold = [
+                (steamid,) for steamid, used_time in self._hot.items()
+                if now - used_time >= self.hot_age]
+            try:
+                with self.cursor() as cursor:
+                    for table, columns in self.TABLE_COLUMNS.items():
+                        cursor.executemany(
+                            'INSERT OR REPLACE INTO main.{0} SELECT {1} '
+                            'FROM hot.{0} WHERE steamid=?'.format(
+                                table, ', '.join(columns)),
+                            dirty)
+                        cursor.executemany(
+                            'DELETE FROM hot.{0} WHERE steamid=?'.format(
+                                table),
+                            cold)
+                self.commit()
+            except Exception:
+                self.rollback()
+                raise
+            self._dirty.clear()
+            for steamid, in cold:
+                del self._hot[steamid]
+
+    def _persist_periodically(self):
+        """Persist the database until it's closed."""
+        while not self._stop_persisting.wait(self.persist_interval):
+            try:
+                self.persist()
+            except Exception:
+                traceback.print_exc()
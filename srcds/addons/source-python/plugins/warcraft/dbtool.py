@@ -0,0 +1,207 @@
+"""Command-line tool for exporting and importing the Warcraft database.
+
+Streams the ``players``, ``heroes``, and ``skills`` tables to and from
+JSON Lines or CSV files, one file per table, keeping memory usage
+constant regardless of the amount of rows. Can be used for backups,
+or for migrating between SQLite and MySQL or between servers.
+
+Run from the ``plugins`` directory:
+
+.. code-block:: none
+
+    python -m warcraft.dbtool export backup --sqlite ../../data/plugins/warcraft.db
+    python -m warcraft.dbtool import backup --mysql host=localhost user=wc db=wc
+"""
+
+# Python 3 imports
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+# Warcraft imports
+import warcraft.database
+
+__all__ = (
+    'export_database',
+    'import_database',
+)
+
+
+class _Progress:
+    """Reports the amount of rows processed and rows per second."""
+
+    def __init__(self, table, interval=1.0, stream=sys.stderr):
+        """Initialize the progress report for a table."""
+        self.table = table
+        self.interval = interval
+        self.stream = stream
+        self.rows = 0
+        self._start_time = self._report_time = time.perf_counter()
+
+    def update(self, rows):
+        """Add processed rows and report them if it's time to."""
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._report_time >= self.interval:
+            self._report_time = now
+            self._report(now)
+
+    def finish(self):
+        """Report the final amount of rows."""
+        self._report(time.perf_counter(), end='\n')
+
+    def _report(self, now, end='\r'):
+        elapsed = max(now - self._start_time, 1e-9)
+        print('{0:>8}: {1:>12,} rows {2:>12,.0f} rows/s'.format(
+            self.table, self.rows, self.rows / elapsed),
+            end=end, file=self.stream, flush=True)
+
+
+def _table_path(directory, table, format_):
+    return os.path.join(directory, '{0}.{1}'.format(table, format_))
+
+
+def _counted(rows, progress, chunk_size):
+    """Pass rows through, updating the progress after every chunk."""
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count == chunk_size:
+            progress.update(count)
+            count = 0
+    progress.update(count)
+
+
+def _write_rows(file, format_, columns, rows):
+    """Write rows into a file in the given format."""
+    if format_ == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            file.write(json.dumps(dict(zip(columns, row))))
+            file.write('\n')
+
+
+def _read_rows(file, format_, columns):
+    """Yield rows from a file with the values in the column order."""
+    if format_ == 'csv':
+        reader = csv.DictReader(file)
+    else:
+        reader = (json.loads(line) for line in file if line.strip())
+    for record in reader:
+        yield tuple(record[column] for column in columns)
+
+
+def export_database(database, directory, format_='jsonl', chunk_size=10000):
+    """Export every table of a database into files in a directory.
+
+    :param warcraft.database._Database database:
+        Database to export the tables from
+    :param str directory:
+        Directory to create the ``<table>.<format_>`` files into
+    :param str format_:
+        Either ``'jsonl'`` or ``'csv'``
+    :param int chunk_size:
+        Amount of rows to fetch from the database at a time
+    """
+    os.makedirs(directory, exist_ok=True)
+    for table, columns in database.TABLE_COLUMNS.items():
+        progress = _Progress(table)
+        path = _table_path(directory, table, format_)
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            rows = database.iter_rows(table, chunk_size)
+            _write_rows(file, format_, columns,
+                        _counted(rows, progress, chunk_size))
+        progress.finish()
+
+
+def import_database(database, directory, format_='jsonl', chunk_size=10000):
+    """Import every table of a database from files in a directory.
+
+    Rows are saved with ``executemany`` in chunks, committing after
+    each chunk. Existing rows with the same primary keys are replaced.
+
+    :param warcraft.database._Database database:
+        Database to import the tables into
+    :param str directory:
+        Directory containing the ``<table>.<format_>`` files
+    :param str format_:
+        Either ``'jsonl'`` or ``'csv'``
+    :param int chunk_size:
+        Amount of rows to save into the database at a time
+    """
+    for table, columns in database.TABLE_COLUMNS.items():
+        path = _table_path(directory, table, format_)
+        if not os.path.exists(path):
+            continue
+        progress = _Progress(table)
+        with open(path, newline='', encoding='utf-8') as file:
+            chunk = []
+            for row in _read_rows(file, format_, columns):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    database.save_rows(table, chunk)
+                    database.commit()
+                    progress.update(len(chunk))
+                    chunk = []
+            if chunk:
+                database.save_rows(table, chunk)
+                database.commit()
+                progress.update(len(chunk))
+        progress.finish()
+
+
+def _parse_mysql_options(options):
+    """Convert ``key=value`` strings into :func:`pymysql.connect` kwargs."""
+    kwargs = {}
+    for option in options:
+        key, sep, value = option.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(
+                "MySQL option '{0}' is not in key=value format.".format(option))
+        kwargs[key] = int(value) if value.isdigit() else value
+    return kwargs
+
+
+def main(argv=None):
+    """Run the tool with command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='python -m warcraft.dbtool',
+        description='Export or import the Warcraft database.')
+    parser.add_argument('command', choices=('export', 'import'))
+    parser.add_argument('directory',
+        help='directory of the table files')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl',
+        help='format of the table files (default: jsonl)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+        help='rows to fetch or save at a time (default: 10000)')
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument('--sqlite', metavar='PATH',
+        help='path to an SQLite database file')
+    backend.add_argument('--mysql', metavar='OPTION=VALUE', nargs='+',
+        help='pymysql.connect() options, e.g. host=localhost db=warcraft')
+    args = parser.parse_args(argv)
+
+    if args.sqlite is not None:
+        database = warcraft.database.SQLite(args.sqlite)
+    else:
+        database = warcraft.database.MySQL(**_parse_mysql_options(args.mysql))
+    try:
+        if args.command == 'export':
+            export_database(
+                database, args.directory, args.format, args.chunk_size)
+        else:
+            import_database(
+                database, args.directory, args.format, args.chunk_size)
+    finally:
+        database.close()
+
+
+if __name__ == '__main__':
+    main()
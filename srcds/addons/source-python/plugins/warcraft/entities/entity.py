@@ -4,7 +4,8 @@
 import math
 
 # Warcraft imports
-from warcraft.utilities import ClassProperty
+from warcraft.scheduler import scheduler
+from warcraft.utilities import CachedClassProperty
 
 __all__ = (
     'Entity',
@@ -37,21 +38,39 @@ class Entity:
     These can all be overridden by a subclass with class attributes.
 
     Also implements :attr:`level` attribute and :meth:`on_max_level`
-    method for managing the instance's current level.
+    method for managing the instance's current level, and a ``dirty``
+    flag which is set whenever the level changes, telling that
+    the entity has changes which have not been saved yet.
+    Whenever the level changes, the owner's
+    ``_on_entity_level_change(entity, previous_level)`` method is
+    called if the owner has one, so the owner can keep count of its
+    entities' levels without summing them up again.
+
+    The instance attributes are stored in ``__slots__`` to save memory,
+    but subclasses can still freely add attributes of their own.
+
+    Delayed and repeated effects can be scheduled with :meth:`delay`
+    and :meth:`repeat`. The entity owns the scheduled calls, so they
+    can all be cancelled with :meth:`cancel_scheduled_calls`.
     """
 
-    @ClassProperty
+    @CachedClassProperty
     def class_id(cls):
         return cls.__qualname__
 
-    @ClassProperty
+    @CachedClassProperty
     def name(cls):
         return cls.__name__.replace('_', ' ')
 
-    @ClassProperty
+    @CachedClassProperty
     def description(cls):
         return cls.__doc__
 
+    # Instances still get a ``__dict__`` for subclasses' own attributes,
+    # but it's only created once such an attribute is first set, and
+    # ``__weakref__`` allows weak references for the method cooldowns
+    __slots__ = ('owner', '_level', 'dirty', '__dict__', '__weakref__')
+
     max_level = math.inf
     required_level = 0
 
@@ -65,6 +84,7 @@ class Entity:
         """
         self.owner = owner
         self._level = level
+        self.dirty = False
 
     @property
     def level(self):
@@ -78,7 +98,14 @@ class Entity:
         if self.max_level < value:
             raise ValueError(
                 "Attempt to set entity's level to a value larger than it's max_level.")
-        self._level = value
+        if value != self._level:
+            previous_level = self._level
+            self._level = value
+            self.dirty = True
+            on_level_change = getattr(
+                self.owner, '_on_entity_level_change', None)
+            if on_level_change is not None:
+                on_level_change(self, previous_level)
 
     def on_max_level(self):
         """Check if an entity is on its maximum level.
@@ -87,3 +114,35 @@ class Entity:
             ``True`` if the entity is on its max level, else ``False``
         """
         return self.level == self.max_level
+
+    def delay(self, delay, callback, *args, **kwargs):
+        """Call a callback once after a delay.
+
+        :param float delay:
+            Seconds to wait before the call
+        :param callable callback:
+            Function to call with the rest of the arguments
+        :returns warcraft.scheduler.ScheduledCall:
+            Handle for cancelling the call
+        """
+        return scheduler.delay(self, delay, callback, *args, **kwargs)
+
+    def repeat(self, interval, callback, *args, limit=None, **kwargs):
+        """Call a callback repeatedly with an interval.
+
+        :param float interval:
+            Seconds between the calls, including before the first one
+        :param callable callback:
+            Function to call with the rest of the arguments
+        :param int|None limit:
+            Amount of calls to make, or ``None`` to repeat until
+            cancelled
+        :returns warcraft.scheduler.ScheduledCall:
+            Handle for cancelling the calls
+        """
+        return scheduler.repeat(
+            self, interval, callback, *args, limit=limit, **kwargs)
+
+    def cancel_scheduled_calls(self):
+        """Cancel all of the entity's delayed and repeated calls."""
+        scheduler.cancel_owner(self)
@@ -2,27 +2,153 @@
 
 # Python 3 imports
 import collections
+import collections.abc
 import math
 
 # Warcraft imports
 from warcraft.entities.entity import Entity
+from warcraft.entities.skill import Skill
 import warcraft.listeners
+from warcraft.profiler import skill_profiler
 
 __all__ = (
     'Hero',
 )
 
 
+def _quota_sum(level, levels):
+    """Get the total xp quota of levels starting from a level.
+
+    Sum of the arithmetic series ``80 + 15 * level`` for the levels
+    ``level, level + 1, ..., level + levels - 1``.
+    """
+    return levels * (80 + 15 * level) + 15 * levels * (levels - 1) // 2
+
+
+def _levels_gained(level, xp, max_levels):
+    """Solve how many levels xp is enough for, starting from a level.
+
+    :param int level:
+        Level to start from
+    :param int xp:
+        Amount of xp to spend on the levels
+    :param int|float max_levels:
+        Maximum amount of levels to gain, possibly ``math.inf``
+    :returns int:
+        Largest amount of levels whose :func:`_quota_sum` fits into xp
+    """
+    if xp < 80 + 15 * level or max_levels <= 0:
+        return 0
+    # Solve 15n^2 + (145 + 30 level) n - 2 xp <= 0 for n, then correct
+    # any floating point error with exact integer arithmetic
+    b = 145 + 30 * level
+    levels = int(min((math.sqrt(b * b + 120 * xp) - b) / 30, max_levels))
+    while levels < max_levels and _quota_sum(level, levels + 1) <= xp:
+        levels += 1
+    while levels > 0 and _quota_sum(level, levels) > xp:
+        levels -= 1
+    return levels
+
+
+def _levels_lost(level, deficit):
+    """Solve how many levels must be lost to cover an xp deficit.
+
+    :param int level:
+        Level to start from, the lost levels' quotas are refunded
+    :param int deficit:
+        Amount of negative xp to cover
+    :returns int:
+        Smallest amount of levels whose quotas cover the deficit,
+        or ``level`` if even losing every level isn't enough
+    """
+    # Solve -15n^2 + (145 + 30 level) n - 2 deficit >= 0 for n
+    b = 145 + 30 * level
+    discriminant = b * b - 120 * deficit
+    if discriminant < 0:
+        return level
+    levels = max(0, min(math.ceil((b - math.sqrt(discriminant)) / 30), level))
+    while levels < level and _quota_sum(level - levels, levels) < deficit:
+        levels += 1
+    while (levels > 0
+            and _quota_sum(level - levels + 1, levels - 1) >= deficit):
+        levels -= 1
+    return levels
+
+
+class _SkillMap(collections.abc.Mapping):
+    """Read-only mapping of a hero's skills, ``{skill.class_id: skill}``.
+
+    Stores the skills in a tuple in the order of the hero class's
+    :attr:`skill_classes`, along with an index of the skills' positions
+    shared by all the heroes of the class, instead of every hero having
+    its own dictionary.
+    """
+
+    __slots__ = ('_index', '_skills')
+
+    def __init__(self, index, skills):
+        """Initialize the mapping.
+
+        :param dict index:
+            Positions of the skills in ``skills``, skill IDs as keys
+        :param tuple skills:
+            The skills in the order of the index's positions
+        """
+        self._index = index
+        self._skills = skills
+
+    def __getitem__(self, skill_id):
+        return self._skills[self._index[skill_id]]
+
+    def get(self, skill_id, default=None):
+        position = self._index.get(skill_id)
+        if position is None:
+            return default
+        return self._skills[position]
+
+    def __contains__(self, skill_id):
+        return skill_id in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._skills)
+
+    def values(self):
+        """Get the skills in the hero class's skill order."""
+        return self._skills
+
+
+class _SkillExecution:
+    """Callback which executes an event through a skill's ``execute()``.
+
+    Indexed in place of the skill's own callbacks for skills which
+    override :meth:`warcraft.entities.skill.Skill.execute`.
+    """
+
+    __slots__ = ('__self__', 'event_name')
+
+    def __init__(self, skill, event_name):
+        self.__self__ = skill
+        self.event_name = event_name
+
+    def __call__(self, **event_args):
+        self.__self__.execute(self.event_name, event_args)
+
+
 class _HeroMeta(type):
     """Metaclass for handling hero classes' skills.
 
     Adds a :attr:`skill_classes` list to all hero classes for storing
-    the skill classes of the hero.
+    the skill classes of the hero, and an index of their positions
+    in the list for the heroes' :class:`_SkillMap`.
     """
 
     def __init__(cls, *args, **kwargs):
         super().__init__(*args, **kwargs)
         cls.skill_classes = []
+        cls._skill_index = {}
 
     def skill(cls, skill_class):
         """Add a skill class to the hero class's :attr:`skill_classes`.
@@ -44,6 +170,9 @@ class _HeroMeta(type):
         if skill_class in cls.skill_classes:
             raise ValueError(
                 "Skill class {0} already added to a hero.".format(skill_class))
+        # Existing heroes keep using the index they were created with
+        cls._skill_index = dict(cls._skill_index)
+        cls._skill_index[skill_class.class_id] = len(cls.skill_classes)
         cls.skill_classes.append(skill_class)
         return skill_class
 
@@ -54,8 +183,9 @@ class _HeroMeta(type):
         :attr:`skill_classes` list to the hero being instantiated.
         """
         instance = super().__call__(*args, **kwargs)
-        for skill_class in cls.skill_classes:
-            instance.skills[skill_class.class_id] = skill_class(instance)
+        instance.skills = _SkillMap(cls._skill_index, tuple(
+            skill_class(instance) for skill_class in cls.skill_classes))
+        instance.refresh_skill_callbacks()
         return instance
 
 
@@ -77,8 +207,18 @@ class Hero(Entity, metaclass=_HeroMeta):
     to compensate the extra powers granted by the upgraded skills.
     Upon a hero reaching its maximum level (if any), the quota will
     jump up to infinite (``math.inf``).
+
+    The used skill points are counted as the skills' levels change,
+    instead of being summed up every time :attr:`skill_points` is read.
+    Setting :attr:`verify_counters` to ``True`` checks the count
+    against the sum on every read, for debugging.
     """
 
+    __slots__ = ('_xp', 'skills', '_skill_callbacks', '_used_skill_points')
+
+    # Check the running counters against a full recount on every read
+    verify_counters = False
+
     def __init__(self, owner, level=0, xp=0):
         """Initialize the hero entity.
 
@@ -91,7 +231,9 @@ class Hero(Entity, metaclass=_HeroMeta):
         """
         super().__init__(owner, level)
         self._xp = xp
-        self.skills = collections.OrderedDict()
+        self.skills = _SkillMap({}, ())
+        self._skill_callbacks = {}
+        self._used_skill_points = 0
 
     @property
     def xp(self):
@@ -120,15 +262,26 @@ class Hero(Entity, metaclass=_HeroMeta):
 
         initial_level = self.level
         self._xp -= amount
-
-        while self.level > 0 and self._xp < 0:
-            self.level -= 1
-            self._xp += self.xp_quota
+        if amount:
+            self.dirty = True
+
+        if self._xp < 0 and self.level > 0:
+            if self._has_default_xp_quota():
+                levels = _levels_lost(self.level, -self._xp)
+                self._xp += _quota_sum(self.level - levels, levels)
+                self.level -= levels
+            else:
+                while self.level > 0 and self._xp < 0:
+                    self.level -= 1
+                    self._xp += self.xp_quota
 
         level_difference = initial_level - self.level
         if level_difference > 0:
             warcraft.listeners.OnHeroLevelDown.manager.notify(
                 hero=self, player=self.owner, levels=level_difference)
+        if amount:
+            warcraft.listeners.OnHeroXpChange.manager.notify(
+                hero=self, player=self.owner, amount=-amount)
 
     def give_xp(self, amount):
         """Give experience points to the hero.
@@ -147,15 +300,26 @@ class Hero(Entity, metaclass=_HeroMeta):
 
         initial_level = self.level
         self._xp += amount
-
-        while not self.on_max_level() and self._xp >= self.xp_quota:
-            self._xp -= self.xp_quota
-            self._level += 1
+        if amount:
+            self.dirty = True
+
+        if self._has_default_xp_quota():
+            levels = _levels_gained(
+                self.level, self._xp, self.max_level - self.level)
+            self._xp -= _quota_sum(self.level, levels)
+            self.level += levels
+        else:
+            while not self.on_max_level() and self._xp >= self.xp_quota:
+                self._xp -= self.xp_quota
+                self.level += 1
 
         level_difference = self.level - initial_level
         if level_difference > 0:
             warcraft.listeners.OnHeroLevelUp.manager.notify(
                 hero=self, player=self.owner, levels=level_difference)
+        if amount:
+            warcraft.listeners.OnHeroXpChange.manager.notify(
+                hero=self, player=self.owner, amount=amount)
 
     @property
     def xp_quota(self):
@@ -163,10 +327,34 @@ class Hero(Entity, metaclass=_HeroMeta):
             return math.inf
         return 80 + 15 * self.level
 
+    @classmethod
+    def _has_default_xp_quota(cls):
+        """Check if the class uses :class:`Hero`'s own :attr:`xp_quota`.
+
+        Levels for the default quota are solved in constant time,
+        while overridden quotas go through the levels one at a time.
+        """
+        return cls.xp_quota is Hero.xp_quota
+
     @property
     def skill_points(self):
-        used_points = sum(skill.level for skill in self.skills.values())
-        return self.level - used_points
+        if self.verify_counters:
+            used_points = sum(skill.level for skill in self.skills.values())
+            if used_points != self._used_skill_points:
+                raise RuntimeError(
+                    "Hero {0} counted {1} used skill points instead of {2}."
+                    .format(self, self._used_skill_points, used_points))
+        return self.level - self._used_skill_points
+
+    def _on_entity_level_change(self, skill, previous_level):
+        """Update the used skill points when a skill's level changes.
+
+        Also rebuilds the index of skills' callbacks when the skill
+        is upgraded from level zero or downgraded back to it.
+        """
+        self._used_skill_points += skill.level - previous_level
+        if (previous_level == 0) != (skill.level == 0):
+            self.refresh_skill_callbacks()
 
     def can_upgrade_skill(self, skill):
         """Check if a hero can upgrade a skill.
@@ -218,15 +406,60 @@ class Hero(Entity, metaclass=_HeroMeta):
         """Reset all of the hero's skills back to level zero."""
         for skill in self.skills.values():
             skill.level = 0
+        for skill in self.skills.values():
             warcraft.listeners.OnSkillDowngrade.manager.notify(
                 skill=skill, hero=self, player=self.owner)
 
+    def refresh_skill_callbacks(self):
+        """Rebuild the index of skills' callbacks used for events.
+
+        Indexes the event callbacks of the skills that have been
+        upgraded to at least level one, so that :meth:`execute_skills`
+        doesn't need to go through every skill on every event.
+
+        The callbacks of skills which override
+        :meth:`warcraft.entities.skill.Skill.execute` are called
+        through their ``execute()`` instead.
+
+        Called automatically whenever a skill's level changes from zero
+        to a positive value or back to zero.
+        """
+        skill_callbacks = collections.defaultdict(list)
+        for skill in self.skills.values():
+            if skill.level <= 0:
+                continue
+            custom_execute = type(skill).execute is not Skill.execute
+            for event_name, callbacks in skill._event_callbacks.items():
+                if custom_execute:
+                    skill_callbacks[event_name].append(
+                        _SkillExecution(skill, event_name))
+                else:
+                    skill_callbacks[event_name].extend(
+                        callback.__get__(skill, type(skill))
+                        for callback in callbacks)
+        self._skill_callbacks = {
+            event_name: tuple(callbacks)
+            for event_name, callbacks in skill_callbacks.items()
+        }
+
+    def cancel_scheduled_calls(self):
+        """Cancel the hero's and its skills' scheduled calls."""
+        super().cancel_scheduled_calls()
+        for skill in self.skills.values():
+            skill.cancel_scheduled_calls()
+
     def execute_skills(self, event_name, event_args):
         """Execute hero's skills for an event.
 
-        Forwards the arguments to the ``execute`` method of the skills
-        that have been upgraded to at least level one.
+        Calls the event's callbacks of the skills that have been
+        upgraded to at least level one, forwarding the arguments.
+        The callbacks are timed while the skill profiler is enabled.
         """
-        for skill in self.skills.values():
-            if skill.level > 0:
-                skill.execute(event_name, event_args)
+        callbacks = self._skill_callbacks.get(event_name)
+        if callbacks is None:
+            return
+        if skill_profiler.enabled:
+            skill_profiler.execute(self, event_name, callbacks, event_args)
+            return
+        for callback in callbacks:
+            callback(**event_args)
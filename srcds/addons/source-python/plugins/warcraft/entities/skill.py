@@ -1,5 +1,8 @@
 """Contains the :class:`Skill` base class for all of the skills."""
 
+# Python 3 imports
+import collections
+
 # Warcraft imports
 from warcraft.entities.entity import Entity
 
@@ -16,7 +19,11 @@ class _SkillMeta(type):
     with the :func:`callback` function.
 
     The decorated functions are added to the ``_event_callbacks`` dict
-    so that the method is the value and the event's name is the key.
+    so that the event's name is the key and a tuple of its callbacks
+    is the value. An event can have any number of callbacks, and
+    the callbacks of base skill classes are included too, base classes'
+    callbacks first. Overriding a callback method in a subclass
+    replaces the base class's callback.
 
     For example:
 
@@ -28,7 +35,7 @@ class _SkillMeta(type):
             def my_callback(self, **event_args):
                 ...
 
-            @callback('player_jump')
+            @callback('player_jump', 'player_spawn')
             def another_callback(self, **event_args):
                 ...
 
@@ -37,21 +44,43 @@ class _SkillMeta(type):
     .. code-block:: none
 
         MySkill._event_callbacks = {
-            'player_attack': my_callback,
-            'player_jump': another_callback,
-            'player_spawn': my_callback,
+            'player_attack': (my_callback,),
+            'player_jump': (another_callback,),
+            'player_spawn': (my_callback, another_callback),
         }
+
+    The dictionary is built only once upon the class's creation.
     """
 
+    @classmethod
+    def __prepare__(mcs, name, bases):
+        """Keep the class's attributes in their definition order."""
+        return collections.OrderedDict()
+
     def __init__(cls, name, bases, attrs):
         """Initialize the skill class and register its callbacks."""
         super().__init__(name, bases, attrs)
-        cls._event_callbacks = {}
-        for attr in attrs.values():
-            if not hasattr(attr, '_events'):
-                continue
-            for event_name in attr._events:
-                cls._event_callbacks[event_name] = attr
+        cls._callback_names = tuple(
+            attr_name for attr_name, attr in attrs.items()
+            if hasattr(attr, '_events'))
+
+        # Callback methods' names from the base classes to this class
+        callback_names = []
+        for base in reversed(cls.__mro__):
+            for attr_name in base.__dict__.get('_callback_names', ()):
+                if attr_name not in callback_names:
+                    callback_names.append(attr_name)
+
+        event_callbacks = collections.OrderedDict()
+        for attr_name in callback_names:
+            attr = getattr(cls, attr_name)
+            for event_name in getattr(attr, '_events', ()):
+                event_callbacks.setdefault(event_name, []).append(attr)
+        cls._event_callbacks = {
+            event_name: tuple(callbacks)
+            for event_name, callbacks in event_callbacks.items()
+        }
+
 
 class Skill(Entity, metaclass=_SkillMeta):
     """Base class for skills which grant special powers to heroes.
@@ -76,10 +105,15 @@ class Skill(Entity, metaclass=_SkillMeta):
             def _boost_health(self, player, **eargs):
                 player.health += self.level * 5
 
-    These registered callbacks will then be executed by
-    the :meth:`execute` method automatically upon an event happening.
+    Once the skill has been upgraded to at least level one, the owning
+    hero indexes these callbacks by event and calls them directly
+    upon an event happening. Skills which need to control how their
+    callbacks are called can override :meth:`execute`, which the hero
+    then calls for each event the skill has callbacks for instead.
     """
 
+    __slots__ = ()
+
     def execute(self, event_name, event_args):
         """Execute any registerd callbacks for the event.
 
@@ -88,8 +122,8 @@ class Skill(Entity, metaclass=_SkillMeta):
         :param dict event_args:
             Event arguments forwarded to the callbacks
         """
-        if event_name in self._event_callbacks:
-            self._event_callbacks[event_name](self, **event_args)
+        for callback in self._event_callbacks.get(event_name, ()):
+            callback(self, **event_args)
 
 
 def callback(*event_names):
@@ -0,0 +1,101 @@
+"""A module with :class:`EventArgs` for passing events to skills."""
+
+# Python 3 imports
+import collections.abc
+
+__all__ = (
+    'EventArgs',
+)
+
+
+class EventArgs(collections.abc.Mapping):
+    """Lazily populated view of a game event's variables.
+
+    Passed to :meth:`warcraft.entities.Hero.execute_skills` instead of
+    a copy of the event's variables. Nothing is read from the event
+    until a skill callback is actually called with the arguments, so
+    events which no skill listens to cost next to nothing. Once read,
+    a variable is cached so that the attacker's and the victim's skills
+    share the same values.
+
+    The ``userid`` variable is left out, and the players involved in
+    the event are passed as keyword arguments so that they replace
+    the event's own variables of the same name:
+
+    .. code-block:: python
+
+        event_args = EventArgs(event, player=attacker,
+                               attacker=attacker, victim=victim)
+        attacker.hero.execute_skills('player_attack', event_args)
+        event_args['player'] = victim
+        victim.hero.execute_skills('player_victim', event_args)
+    """
+
+    __slots__ = ('_event', '_players', '_values', '_keys')
+
+    # Names of each event's variables, minus ``userid``
+    _event_keys = {}
+
+    def __init__(self, event, **players):
+        """Initialize the view over an event.
+
+        :param events.GameEvent event:
+            Game event to read the variables from
+        :param dict \*\*players:
+            Players to pass instead of the event's own variables
+        """
+        self._event = event
+        self._players = players
+        self._values = {}
+        self._keys = None
+
+    def __setitem__(self, key, player):
+        """Replace one of the players passed to the callbacks."""
+        if key not in self._players:
+            self._keys = None
+        self._players[key] = player
+
+    def __getitem__(self, key):
+        try:
+            return self._players[key]
+        except KeyError:
+            pass
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        if key not in self._get_event_keys():
+            raise KeyError(key)
+        value = self._values[key] = self._event[key]
+        return value
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return key in self._players or key in self._get_event_keys()
+
+    def keys(self):
+        """Return the names of the arguments.
+
+        Used by the ``**`` operator before reading the values.
+        """
+        if self._keys is None:
+            self._keys = tuple(self._players) + tuple(
+                key for key in self._get_event_keys()
+                if key not in self._players)
+        return self._keys
+
+    def _get_event_keys(self):
+        """Get the names of the event's variables, cached per event."""
+        name = self._event.name
+        try:
+            return self._event_keys[name]
+        except KeyError:
+            pass
+        keys = self._event_keys[name] = frozenset(
+            self._event.variables.as_dict()) - {'userid'}
+        return keys
@@ -1,13 +1,143 @@
-"""Package which imports all hero classes from all modules."""
+"""Package which imports all hero classes from all modules.
+
+Importing every hero module on load gets slow with a lot of heroes,
+so :func:`get_lazy_heroes` reads the heroes' information from a cached
+manifest instead, and the hero modules are only imported once a hero
+is actually created. The manifest is rebuilt for any modules whose
+source files have changed since.
+"""
+
+# Python 3 imports
+import collections
+import importlib
+import json
+import os
+import pkgutil
+import sys
 
 # Warcraft imports
-from warcraft.utilities import get_classes_from_package
+from warcraft.utilities import get_classes_from_module
 from warcraft.entities import Hero
 
 __all__ = (
     'get_heroes',
+    'get_lazy_heroes',
+    'HeroInfo',
+    'SkillInfo',
 )
 
+# Version of the manifest's format, older manifests are rebuilt
+_MANIFEST_VERSION = 1
+
+# A skill class's information, where ``events`` is a tuple of the names
+# of the events the skill has callbacks for
+SkillInfo = collections.namedtuple(
+    'SkillInfo', ('class_id', 'name', 'description', 'events'))
+
+
+class HeroInfo:
+    """Information of a hero class, importing the class only when needed.
+
+    Has the same :attr:`class_id`, :attr:`name`, :attr:`description`,
+    :attr:`required_level`, and :attr:`skill_classes` attributes as
+    the hero class, the last being a list of :class:`SkillInfo`, so it
+    can be used in the place of the hero class for menus and checking
+    which heroes the players have unlocked.
+
+    Calling the info creates a hero just like calling the hero class,
+    importing the hero's module if it hasn't been imported yet.
+    """
+
+    def __init__(self, module_name, attribute, class_id, name, description,
+                 required_level, skills):
+        """Initialize the information of a hero class.
+
+        :param str module_name:
+            Name of the module to import the hero class from
+        :param str attribute:
+            Name of the hero class in the module
+        :param list skills:
+            :class:`SkillInfo` arguments of the hero's skill classes
+        """
+        self.module_name = module_name
+        self.attribute = attribute
+        self.class_id = class_id
+        self.name = name
+        self.description = description
+        self.required_level = required_level
+        self.skill_classes = [
+            SkillInfo(class_id, name, description, tuple(events))
+            for class_id, name, description, events in skills
+        ]
+        self._hero_class = None
+
+    @classmethod
+    def from_class(cls, module_name, attribute, hero_class):
+        """Get the information of an imported hero class."""
+        return cls(
+            module_name, attribute, hero_class.class_id, hero_class.name,
+            hero_class.description, hero_class.required_level,
+            [(skill_class.class_id, skill_class.name,
+                skill_class.description,
+                tuple(sorted(skill_class._event_callbacks)))
+             for skill_class in hero_class.skill_classes])
+
+    def to_json(self):
+        """Get the information as a JSON serializable dict."""
+        return collections.OrderedDict((
+            ('attribute', self.attribute),
+            ('class_id', self.class_id),
+            ('name', self.name),
+            ('description', self.description),
+            ('required_level', self.required_level),
+            ('skills', [list(skill) for skill in self.skill_classes]),
+        ))
+
+    def load(self):
+        """Import and get the hero class."""
+        if self._hero_class is None:
+            module = importlib.import_module(self.module_name)
+            self._hero_class = getattr(module, self.attribute)
+        return self._hero_class
+
+    def __call__(self, *args, **kwargs):
+        """Create a hero of the class."""
+        return self.load()(*args, **kwargs)
+
+
+def _iter_hero_modules(paths, prefix):
+    """Yield the names and source files of the hero modules.
+
+    Goes through subpackages recursively without importing them.
+    Ignores modules with a leading underscore in their name.
+    """
+    for finder, module_name, ispkg in pkgutil.iter_modules(paths):
+        if module_name.startswith('_'):
+            continue
+        if ispkg:
+            yield from _iter_hero_modules(
+                [os.path.join(finder.path, module_name)],
+                prefix + module_name + '.')
+        else:
+            spec = finder.find_spec(module_name)
+            yield prefix + module_name, spec.origin
+
+
+def _iter_module_heroes(module_name, reload=False):
+    """Import a module and yield its hero classes with their names.
+
+    If ``reload`` is true, a module which has already been imported
+    is reloaded so that its changes are seen.
+    """
+    module = sys.modules.get(module_name) if reload else None
+    if module is None:
+        module = importlib.import_module(module_name)
+    else:
+        module = importlib.reload(module)
+    for cls in get_classes_from_module(module):
+        if issubclass(cls, Hero):
+            yield cls.__name__, cls
+
 
 def get_heroes():
     """Yield all the heroes to use on the server.
@@ -17,6 +147,62 @@ def get_heroes():
 
     Ignores modules and classes with a leading underscore in their name.
     """
-    for cls in get_classes_from_package(__path__):
-        if issubclass(cls, Hero):
+    for module_name, path in _iter_hero_modules(__path__, __name__ + '.'):
+        for attribute, cls in _iter_module_heroes(module_name):
             yield cls
+
+
+def _read_manifest(path):
+    """Read the modules' entries from a manifest file."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != _MANIFEST_VERSION:
+        return {}
+    return manifest['modules']
+
+
+def _write_manifest(path, modules):
+    """Write the modules' entries into a manifest file."""
+    temp_path = '{0}.tmp'.format(path)
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'version': _MANIFEST_VERSION, 'modules': modules},
+                  file, indent=1)
+    os.replace(temp_path, path)
+
+
+def get_lazy_heroes(manifest_path):
+    """Get information of all the heroes to use on the server.
+
+    Reads the heroes from the manifest file and only imports the modules
+    which are new or whose source files have been modified since the
+    manifest was written, after which the manifest is updated.
+    Modules which were already imported are reloaded, so this can
+    also be called again to pick up changes to the heroes.
+
+    :param str manifest_path:
+        Path to the manifest file, created if it doesn't exist
+    :returns list:
+        :class:`HeroInfo` of every hero
+    """
+    manifest_path = str(manifest_path)
+    modules = _read_manifest(manifest_path)
+    new_modules = collections.OrderedDict()
+    for module_name, path in _iter_hero_modules(__path__, __name__ + '.'):
+        mtime = os.path.getmtime(path)
+        entry = modules.get(module_name)
+        if entry is None or entry['mtime'] != mtime:
+            entry = {'mtime': mtime, 'heroes': [
+                HeroInfo.from_class(module_name, attribute, cls).to_json()
+                for attribute, cls in _iter_module_heroes(module_name, True)
+            ]}
+        new_modules[module_name] = entry
+    if new_modules != modules:
+        _write_manifest(manifest_path, new_modules)
+    return [
+        HeroInfo(module_name, **hero)
+        for module_name, entry in new_modules.items()
+        for hero in entry['heroes']
+    ]
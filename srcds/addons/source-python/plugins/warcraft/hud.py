@@ -0,0 +1,94 @@
+"""A module with :class:`CooldownHud` for showing skills' cooldowns."""
+
+# Python 3 imports
+import math
+
+# Warcraft imports
+import warcraft.cooldown
+
+__all__ = (
+    'CooldownHud',
+)
+
+
+class CooldownHud:
+    """Shows players the remaining cooldowns of their skills.
+
+    Every :meth:`update` samples the cooldowns of all the given players
+    in one pass and renders a text for each player, such as:
+
+    .. code-block:: none
+
+        Entangling Roots: 4 s
+        Evasion: 12 s
+
+    A player is only sent the text when it differs from the previous
+    text sent to him. Cooldowns are rounded up to whole seconds, so
+    a player gets at most one message per second per skill, no matter
+    how often the HUD is updated. The HUD should be updated once
+    every :attr:`interval` seconds, which bounds how late a change
+    can be shown. Keeps count of messages ``sent`` and ``suppressed``
+    because nothing had changed.
+    """
+
+    def __init__(self, send, interval=0.5):
+        """Initialize the HUD with a function for sending the texts.
+
+        :param callable send:
+            Function to call with a player and his text, the text is
+            empty once none of his skills are on cooldown anymore
+        :param float interval:
+            Seconds between sampling the cooldowns with :meth:`update`
+        """
+        self.send = send
+        self.interval = interval
+        self._previous_texts = {}
+        self.sent = 0
+        self.suppressed = 0
+
+    def update(self, players):
+        """Send the players whose cooldowns have changed their texts.
+
+        :param iterable players:
+            Players to update the HUD for
+        """
+        for player in players:
+            text = self.render(player)
+            if self._previous_texts.get(player.index, '') == text:
+                self.suppressed += 1
+                continue
+            self._previous_texts[player.index] = text
+            self.send(player, text)
+            self.sent += 1
+
+    def forget(self, index):
+        """Forget the previous text sent to a player who has left.
+
+        :param int index:
+            Index of the player to forget
+        """
+        self._previous_texts.pop(index, None)
+
+    def clear(self):
+        """Forget the previous texts sent to every player."""
+        self._previous_texts.clear()
+
+    @staticmethod
+    def render(player):
+        """Render the text of a player's skills' remaining cooldowns.
+
+        :param warcraft.player.Player player:
+            Player whose skills' cooldowns to render
+        :returns str:
+            One line per skill on cooldown, or an empty string
+        """
+        lines = []
+        for skill in player.hero.skills.values():
+            if skill.level == 0:
+                continue
+            cooldowns = warcraft.cooldown.get_cooldowns(skill)
+            remaining = max(cooldowns.values(), default=0)
+            if remaining > 0:
+                lines.append('{0}: {1} s'.format(
+                    skill.name, math.ceil(remaining)))
+        return '\n'.join(lines)
@@ -0,0 +1,159 @@
+"""A module with :class:`Journal` for recording heroes' progress."""
+
+# Python 3 imports
+import collections
+import os
+import shutil
+
+__all__ = (
+    'Journal',
+)
+
+
+class Journal:
+    """Append-only journal of changes to heroes and skills.
+
+    Every change to a hero's level and xp or to a skill's level is
+    appended into a journal file as a single line, written through
+    a buffered file so that recording a change costs next to nothing
+    compared to committing it into the database.
+
+    Records contain the values after the change rather than the amount
+    changed, so folding the journal into the database is idempotent
+    and only the last record of each hero and skill needs to be written.
+
+    The journal is periodically :meth:`compact`-ed into the database.
+    If the server crashes before that, the journal is replayed into
+    the database when it's opened the next time.
+
+    Record formats (tab separated):
+
+    .. code-block:: none
+
+        h  steamid  hero_id  level  xp
+        s  steamid  hero_id  skill_id  level
+    """
+
+    def __init__(self, path, database, buffer_size=65536):
+        """Replay any leftover journals and open the journal file.
+
+        :param str path:
+            Path to the journal file
+        :param warcraft.database._Database database:
+            Database to replay any leftover journals into
+        :param int buffer_size:
+            Size of the buffer for the journal file in bytes
+        """
+        self.path = str(path)
+        self._compacting_path = self.path + '.compacting'
+        self.buffer_size = buffer_size
+        self._folding = False
+        self.replay(database)
+        self._file = self._open()
+
+    def _open(self):
+        """Open the journal file for appending."""
+        return open(
+            self.path, 'a', buffering=self.buffer_size, encoding='utf-8')
+
+    def record_hero(self, steamid, hero):
+        """Record a hero's current level and xp."""
+        self._file.write('h\t{0}\t{1}\t{2}\t{3}\n'.format(
+            steamid, hero.class_id, hero.level, hero.xp))
+
+    def record_skill(self, steamid, hero, skill):
+        """Record a skill's current level."""
+        self._file.write('s\t{0}\t{1}\t{2}\t{3}\n'.format(
+            steamid, hero.class_id, skill.class_id, skill.level))
+
+    def flush(self):
+        """Flush the buffered records into the journal file."""
+        self._file.flush()
+
+    def close(self):
+        """Close the journal file, removing it if it's empty."""
+        self._file.close()
+        if os.path.getsize(self.path) == 0:
+            os.remove(self.path)
+
+    def compact(self, writer):
+        """Fold the journal into the database on a writer's thread.
+
+        The current journal file is renamed and a new one is started,
+        after which the renamed journal is folded into the database
+        on the writer's thread and removed once it has been committed.
+
+        If a previous fold has failed, its renamed journal is still
+        there, so the current journal is appended into it instead
+        and the fold is retried with both.
+
+        :param warcraft.database.Writer writer:
+            Writer to fold the journal into the database with
+        """
+        if self._folding:
+            return  # The previous compaction is unfinished
+        self._file.close()
+        if os.path.exists(self._compacting_path):
+            with open(self.path, 'rb') as journal, \
+                    open(self._compacting_path, 'ab') as compacting:
+                shutil.copyfileobj(journal, compacting)
+            os.remove(self.path)
+        elif os.path.getsize(self.path) > 0:
+            os.rename(self.path, self._compacting_path)
+        else:
+            self._file = self._open()
+            return  # Nothing to compact
+        self._file = self._open()
+        self._folding = True
+        writer.call(self._fold_compacting_journal)
+
+    def replay(self, database):
+        """Fold any leftover journal files into a database.
+
+        :param warcraft.database._Database database:
+            Database to fold the journals into
+        """
+        self._fold(database, self._compacting_path, self.path)
+
+    def _fold_compacting_journal(self, database):
+        """Fold the journal which is being compacted into a database.
+
+        The journal is left in place if the fold fails, so that it's
+        retried on the next :meth:`compact`.
+        """
+        try:
+            self._fold(database, self._compacting_path)
+        finally:
+            self._folding = False
+
+    @staticmethod
+    def _fold(database, *paths):
+        """Fold journal files into a database and remove them.
+
+        Only the last record of each hero and skill is written,
+        all in one transaction. The files are removed only once
+        the database has been persisted.
+        """
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            return
+        heroes = collections.OrderedDict()
+        skills = collections.OrderedDict()
+        for path in paths:
+            with open(path, encoding='utf-8') as journal:
+                for line in journal:
+                    record = line[:-1].split('\t')
+                    if not line.endswith('\n') or len(record) != 5:
+                        continue  # Partially written record
+                    kind, steamid, hero_id, value1, value2 = record
+                    if kind == 'h':
+                        heroes[steamid, hero_id] = (
+                            steamid, hero_id, int(value1), int(value2))
+                    elif kind == 's':
+                        skills[steamid, hero_id, value1] = (
+                            steamid, hero_id, value1, int(value2))
+        database.save_data((), heroes.values(), skills.values())
+        # The journals are the only copy until they've reached the disk
+        database.persist()
+        for path in paths:
+            os.remove(path)
@@ -7,6 +7,7 @@ from listeners import ListenerManagerDecorator
 __all__ = (
     'OnHeroLevelUp',
     'OnHeroLevelDown',
+    'OnHeroXpChange',
     'OnSkillUpgrade',
     'OnSkillDowngrade',
 )
@@ -34,6 +35,19 @@ class OnHeroLevelDown(ListenerManagerDecorator):
     manager = ListenerManager()
 
 
+class OnHeroXpChange(ListenerManagerDecorator):
+    """Listener to notify when a hero gains or loses experience points.
+
+    Notified after any level changes caused by the experience points.
+
+    Arguments for callbacks:
+        :class:`warcraft.entities.Hero` hero: Hero whose xp changed
+        :class:`warcraft.player.Player` player: Player whose hero it was
+        :class:`int` amount: Amount of xp gained, negative if lost
+    """
+    manager = ListenerManager()
+
+
 class OnSkillUpgrade(ListenerManagerDecorator):
     """Listener to notify when a skill is upgraded.
 
@@ -1,10 +1,13 @@
 # Python 3 imports
 import collections
+import collections.abc
 
 # Custom Source.Python imports
 import easyplayer
 
 # Warcraft imports
+import warcraft.cooldown
+from warcraft.database import HeroData
 from warcraft.entities import Hero
 
 __all__ = (
@@ -12,15 +15,126 @@ __all__ = (
 )
 
 
+class _HeroDict(collections.abc.MutableMapping):
+    """Ordered mapping of a player's heroes, created only when needed.
+
+    Heroes can be added as unloaded records of their class and data
+    with :meth:`add_unloaded`, in which case the hero and its skills
+    are only created once the hero is accessed with ``heroes[hero_id]``,
+    for example when it becomes the active hero. Checking if a hero is
+    owned, iterating over the hero IDs, and reading a hero's level or
+    data with :meth:`get_level` and :meth:`get_data` don't create it.
+
+    Keeps the player's total level up to date as heroes are added
+    and removed.
+    """
+
+    def __init__(self, player):
+        self._player = player
+        self._entries = collections.OrderedDict()
+
+    def add_unloaded(self, hero_class, hero_data=None):
+        """Add a hero which is created once it's accessed.
+
+        :param type hero_class:
+            Class of the hero
+        :param warcraft.database.HeroData|None hero_data:
+            Level, xp, and skills' levels to create the hero with,
+            or ``None`` for a new hero
+        """
+        if hero_data is None:
+            hero_data = HeroData(0, 0, {})
+        self._set_entry(hero_class.class_id, (hero_class, hero_data))
+
+    def get_loaded(self, hero_id, default=None):
+        """Get a hero only if it has already been created."""
+        entry = self._entries.get(hero_id, default)
+        return default if isinstance(entry, tuple) else entry
+
+    def get_level(self, hero_id):
+        """Get a hero's level without creating the hero."""
+        entry = self._entries[hero_id]
+        if isinstance(entry, tuple):
+            return entry[1].level
+        return entry.level
+
+    def get_data(self, hero_id):
+        """Get a hero's current data without creating the hero.
+
+        :returns warcraft.database.HeroData:
+            The hero's level, xp, and skills' levels
+        """
+        entry = self._entries[hero_id]
+        if isinstance(entry, tuple):
+            return entry[1]
+        return HeroData(entry.level, entry.xp, {
+            skill_id: skill.level for skill_id, skill in entry.skills.items()
+        })
+
+    def loaded_items(self):
+        """Yield ``(hero_id, hero)`` pairs of the created heroes."""
+        for hero_id, entry in self._entries.items():
+            if not isinstance(entry, tuple):
+                yield hero_id, entry
+
+    def __getitem__(self, hero_id):
+        entry = self._entries[hero_id]
+        if isinstance(entry, tuple):
+            entry = self._entries[hero_id] = self._load(*entry)
+        return entry
+
+    def _load(self, hero_class, hero_data):
+        """Create a hero and its skills from the hero's data."""
+        hero = hero_class(self._player, hero_data.level, hero_data.xp)
+        for skill_id, level in hero_data.skills.items():
+            skill = hero.skills.get(skill_id)
+            if skill is not None:
+                skill.level = level
+                skill.dirty = False
+        return hero
+
+    def __setitem__(self, hero_id, hero):
+        self._set_entry(hero_id, hero)
+
+    def _set_entry(self, hero_id, entry):
+        if hero_id in self._entries:
+            self._player._total_level -= self.get_level(hero_id)
+        self._entries[hero_id] = entry
+        self._player._total_level += self.get_level(hero_id)
+
+    def __delitem__(self, hero_id):
+        self._player._total_level -= self.get_level(hero_id)
+        del self._entries[hero_id]
+
+    def __contains__(self, hero_id):
+        return hero_id in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class Player(easyplayer.Player):
     """Player class with support for managing Warcraft heroes.
 
-    Each player has an ordered dictionary of his heroes in the format
-    of ``{hero.class_id: hero}`` stored into :attr:`heroes` attribute.
+    Each player has an ordered mapping of his heroes in the format
+    of ``{hero.class_id: hero}`` stored into :attr:`heroes` attribute,
+    where the heroes are only created once they're first accessed.
     The player also has a :attr:`hero` attribute to store the hero
-    he's currently playing with.
+    he's currently playing with, and a ``dirty`` flag which is set
+    when the active hero changes and hasn't been saved yet.
+    Changing the hero cancels the previous hero's scheduled calls.
+
+    The total level of the heroes is counted as their levels change.
+    Setting :attr:`verify_counters` to ``True`` checks the count
+    against the sum on every read, for debugging.
     """
 
+    # Check the running counters against a full recount on every read
+    verify_counters = False
+
     def __init__(self, index):
         """Initialize the player.
 
@@ -28,8 +142,10 @@ class Player(easyplayer.Player):
             Index of the player entity
         """
         super().__init__(index)
-        self.heroes = collections.OrderedDict()
+        self._total_level = 0
+        self.heroes = _HeroDict(self)
         self._hero = None
+        self.dirty = False
 
     @property
     def hero(self):
@@ -43,8 +159,45 @@ class Player(easyplayer.Player):
         if value.class_id not in self.heroes:
             raise ValueError(
                 "Hero {0} not owned by player.".format(value))
-        self._hero = value
+        if value is not self._hero:
+            if self._hero is not None:
+                self._hero.cancel_scheduled_calls()
+            self._hero = value
+            self.dirty = True
 
     def calculate_total_level(self):
-        """Calculate the total level of all of player's heroes."""
-        return sum(hero.level for hero in self.heroes.values()) 
+        """Get the total level of all of player's heroes."""
+        if self.verify_counters:
+            total_level = sum(
+                self.heroes.get_level(hero_id) for hero_id in self.heroes)
+            if total_level != self._total_level:
+                raise RuntimeError(
+                    "Player {0} counted a total level of {1} instead of {2}."
+                    .format(self.steamid, self._total_level, total_level))
+        return self._total_level
+
+    def _on_entity_level_change(self, hero, previous_level):
+        """Update the total level when an owned hero's level changes."""
+        if self.heroes.get_loaded(hero.class_id) is hero:
+            self._total_level += hero.level - previous_level
+
+    def get_cooldowns(self):
+        """Get the remaining cooldowns of the active hero and its skills.
+
+        :returns dict:
+            ``{entity.class_id: {method_name: cooldown}}`` for
+            the hero and each of its skills with cooldown methods
+        """
+        cooldowns = {}
+        for entity in (self.hero,) + tuple(self.hero.skills.values()):
+            entity_cooldowns = warcraft.cooldown.get_cooldowns(entity)
+            if entity_cooldowns:
+                cooldowns[entity.class_id] = entity_cooldowns
+        return cooldowns
+
+    def reset_cooldowns(self):
+        """Reset the cooldowns of all the created heroes and skills."""
+        for hero_id, hero in self.heroes.loaded_items():
+            warcraft.cooldown.reset_cooldowns(hero)
+            for skill in hero.skills.values():
+                warcraft.cooldown.reset_cooldowns(skill)
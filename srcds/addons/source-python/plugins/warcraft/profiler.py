@@ -0,0 +1,153 @@
+"""A module with :class:`SkillProfiler` for timing skills' callbacks."""
+
+# Python 3 imports
+import collections
+import math
+import time
+
+__all__ = (
+    'SkillProfiler',
+    'skill_profiler',
+)
+
+
+class _CallbackStats:
+    """Timings of a skill's callbacks for one event."""
+
+    __slots__ = ('count', 'total_time', 'max_time', 'samples')
+
+    def __init__(self, sample_size):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = collections.deque(maxlen=sample_size)
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        self.samples.append(elapsed)
+
+    def percentile(self, percent):
+        """Get a percentile of the most recent samples."""
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        index = math.ceil(len(samples) * percent / 100) - 1
+        return samples[max(index, 0)]
+
+
+class SkillProfiler:
+    """Opt-in profiler for the skills' event callbacks.
+
+    While :attr:`enabled`, :meth:`warcraft.entities.Hero.execute_skills`
+    runs the callbacks through :meth:`execute`, which times each call
+    and records the amount of calls and the total, maximum, and 99th
+    percentile times for each ``(hero_id, skill_id, event_name)``.
+    While disabled, the only cost is checking the :attr:`enabled` flag.
+
+    The percentile is calculated from the latest ``sample_size`` calls
+    to keep the memory usage bounded.
+    """
+
+    def __init__(self, sample_size=1024):
+        """Initialize a disabled profiler.
+
+        :param int sample_size:
+            Amount of latest calls to calculate the percentile from
+        """
+        self.sample_size = sample_size
+        self.enabled = False
+        self.stats = {}
+        self._start_time = None
+
+    def enable(self):
+        """Start profiling the callbacks."""
+        if not self.enabled:
+            self.enabled = True
+            self._start_time = time.monotonic()
+
+    def disable(self):
+        """Stop profiling the callbacks, keeping the collected stats."""
+        self.enabled = False
+
+    def reset(self):
+        """Clear the collected stats."""
+        self.stats.clear()
+        if self.enabled:
+            self._start_time = time.monotonic()
+
+    def execute(self, hero, event_name, callbacks, event_args):
+        """Call and time skills' bound callbacks for a hero's event.
+
+        :param warcraft.entities.Hero hero:
+            Hero whose skills' callbacks are being called
+        :param str event_name:
+            Name of the event the callbacks are called for
+        :param tuple callbacks:
+            Callbacks bound to the skills
+        :param dict event_args:
+            Event arguments forwarded to the callbacks
+        """
+        for callback in callbacks:
+            start_time = time.perf_counter()
+            try:
+                callback(**event_args)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                key = (hero.class_id, callback.__self__.class_id, event_name)
+                stats = self.stats.get(key)
+                if stats is None:
+                    stats = self.stats[key] = _CallbackStats(self.sample_size)
+                stats.add(elapsed)
+
+    def top(self, limit=10):
+        """Get the callbacks which have used the most time in total.
+
+        :param int limit:
+            Maximum amount of callbacks to get
+        :returns list:
+            ``(hero_id, skill_id, event_name, count, total_time,
+            max_time, p99_time)`` tuples, times in seconds
+        """
+        items = sorted(self.stats.items(),
+            key=lambda item: item[1].total_time, reverse=True)[:limit]
+        return [
+            key + (stats.count, stats.total_time,
+                stats.max_time, stats.percentile(99))
+            for key, stats in items
+        ]
+
+    def format_report(self, limit=10):
+        """Format the :meth:`top` callbacks into a table.
+
+        :param int limit:
+            Maximum amount of callbacks to include
+        :returns str:
+            The table with times in milliseconds
+        """
+        if self._start_time is None:
+            duration = 0.0
+        else:
+            duration = time.monotonic() - self._start_time
+        lines = [
+            'Skill profile: {0} callbacks over {1:.0f} s, profiler {2}'.format(
+                len(self.stats), duration,
+                'enabled' if self.enabled else 'disabled'),
+            '{0:<20} {1:<24} {2:<18} {3:>8} {4:>10} {5:>8} {6:>8}'.format(
+                'Hero', 'Skill', 'Event', 'Calls',
+                'Total ms', 'Max ms', 'p99 ms'),
+        ]
+        for (hero_id, skill_id, event_name, count,
+                total_time, max_time, p99_time) in self.top(limit):
+            lines.append(
+                '{0:<20} {1:<24} {2:<18} {3:>8} {4:>10.3f} '
+                '{5:>8.3f} {6:>8.3f}'.format(
+                    hero_id, skill_id, event_name, count,
+                    total_time * 1000, max_time * 1000, p99_time * 1000))
+        return '\n'.join(lines)
+
+
+# Profiler used by the heroes for executing their skills
+skill_profiler = SkillProfiler()
@@ -0,0 +1,102 @@
+"""A module with :class:`SaveScheduler` for spreading periodic saves."""
+
+# Python 3 imports
+import collections
+import math
+import time
+
+__all__ = (
+    'SaveScheduler',
+)
+
+
+class SaveScheduler:
+    """Scheduler for spreading periodic saves across a save interval.
+
+    Instead of saving every target at once, which causes a noticeable
+    spike in frame time, the targets are saved a few at a time over
+    the whole :attr:`interval`, so that each target still gets saved
+    once per interval.
+
+    The :meth:`tick` method should be called on every server tick.
+    Each tick saves as many targets as are due by then, but stops
+    early once :attr:`time_budget` has been used up. Targets which
+    didn't fit into a tick's budget are simply saved on the next ticks.
+
+    The targets should be keys rather than the objects to save, such as
+    players' indexes, so that objects which are gone by the time their
+    key comes due are never saved. Targets which appear mid-cycle can
+    be :meth:`add`-ed to the ongoing cycle.
+
+    Keeps count of ``saves`` done and ``ticks_over_budget``.
+    """
+
+    def __init__(self, save, get_targets, interval=240, time_budget=0.002):
+        """Initialize the scheduler.
+
+        :param callable save:
+            Function to call with a target to save it, which should
+            skip the target if there's nothing to save anymore
+        :param callable get_targets:
+            Function which returns the targets to save on each cycle
+        :param float interval:
+            Seconds in which every target should get saved once
+        :param float time_budget:
+            Maximum seconds to spend saving targets during one tick
+        """
+        self.save = save
+        self.get_targets = get_targets
+        self.interval = interval
+        self.time_budget = time_budget
+        self._queue = collections.deque()
+        self._queued = set()
+        self._cycle_start = time.monotonic()
+        self._cycle_size = 0
+        self._saved_count = 0
+        self.saves = 0
+        self.ticks_over_budget = 0
+
+    def tick(self):
+        """Save the targets which are due by now, within the budget."""
+        now = time.monotonic()
+        if not self._queue:
+            if now - self._cycle_start < self.interval:
+                return
+            self._start_cycle(now)
+        progress = min(1, (now - self._cycle_start) / self.interval)
+        due_count = math.ceil(self._cycle_size * progress) - self._saved_count
+        deadline = time.perf_counter() + self.time_budget
+        while due_count > 0 and self._queue:
+            target = self._queue.popleft()
+            self._queued.discard(target)
+            self.save(target)
+            self._saved_count += 1
+            self.saves += 1
+            due_count -= 1
+            if time.perf_counter() >= deadline:
+                if due_count > 0 and self._queue:
+                    self.ticks_over_budget += 1
+                break
+
+    def add(self, target):
+        """Add a target to the ongoing cycle, unless it's already in it.
+
+        If no cycle is ongoing, the target is left to the next cycle.
+
+        :param object target:
+            Target to add
+        """
+        if self._queue and target not in self._queued:
+            self._queue.append(target)
+            self._queued.add(target)
+            self._cycle_size += 1
+
+    def _start_cycle(self, now):
+        """Start a new cycle of saving all the targets."""
+        for target in self.get_targets():
+            if target not in self._queued:
+                self._queue.append(target)
+                self._queued.add(target)
+        self._cycle_start = now
+        self._cycle_size = len(self._queue)
+        self._saved_count = 0
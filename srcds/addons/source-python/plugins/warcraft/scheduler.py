@@ -0,0 +1,197 @@
+"""A module with :class:`Scheduler` for delayed and repeated calls."""
+
+# Python 3 imports
+import math
+import traceback
+
+__all__ = (
+    'ScheduledCall',
+    'Scheduler',
+    'scheduler',
+)
+
+
+class ScheduledCall:
+    """Handle of a call scheduled with a :class:`Scheduler`.
+
+    Can be used to :meth:`cancel` the call before it happens.
+    """
+
+    __slots__ = (
+        '_scheduler', 'owner', 'callback', 'args', 'kwargs',
+        'interval', 'limit', '_slot', '_rounds', '_active',
+    )
+
+    def __init__(self, scheduler, owner, callback, args, kwargs,
+                 interval, limit):
+        self._scheduler = scheduler
+        self.owner = owner
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.limit = limit
+        self._slot = None
+        self._rounds = 0
+        self._active = True
+
+    @property
+    def active(self):
+        """``True`` until the call is done or cancelled."""
+        return self._active
+
+    def cancel(self):
+        """Cancel the call if it hasn't happened yet."""
+        self._scheduler.cancel(self)
+
+
+class Scheduler:
+    """Hashed timing wheel for scheduling calls a number of ticks away.
+
+    The wheel is a ring of ``size`` slots, each holding the calls due
+    on the ticks which land on it. :meth:`tick` must be called once on
+    every server tick, after which it advances to the next slot and
+    runs the calls in there which are due on this round of the ring.
+    Scheduling and cancelling calls are both O(1), and each tick only
+    looks at a single slot no matter how many calls there are.
+
+    Each call is scheduled for an owner, usually a hero or a skill,
+    so that all of the owner's calls can be cancelled at once with
+    :meth:`cancel_owner`, for example when its player dies.
+    """
+
+    def __init__(self, tick_interval, size=512):
+        """Initialize the scheduler.
+
+        :param float tick_interval:
+            Seconds between two calls to :meth:`tick`
+        :param int size:
+            Amount of slots in the wheel
+        """
+        self.tick_interval = tick_interval
+        self.size = size
+        self._slots = [set() for _ in range(size)]
+        self._cursor = 0
+        self._owned = {}
+
+    def __len__(self):
+        """Get the amount of scheduled calls."""
+        return sum(len(calls) for calls in self._owned.values())
+
+    def delay(self, owner, delay, callback, *args, **kwargs):
+        """Call a callback once after a delay.
+
+        :param object owner:
+            Owner of the call, for :meth:`cancel_owner`
+        :param float delay:
+            Seconds to wait before the call
+        :param callable callback:
+            Function to call with the rest of the arguments
+        :returns ScheduledCall:
+            Handle for cancelling the call
+        """
+        return self._schedule(ScheduledCall(
+            self, owner, callback, args, kwargs, None, 1), delay)
+
+    def repeat(self, owner, interval, callback, *args, limit=None, **kwargs):
+        """Call a callback repeatedly with an interval.
+
+        The first call happens after one interval.
+
+        :param object owner:
+            Owner of the calls, for :meth:`cancel_owner`
+        :param float interval:
+            Seconds between the calls
+        :param callable callback:
+            Function to call with the rest of the arguments
+        :param int|None limit:
+            Amount of calls to make, or ``None`` to repeat until
+            cancelled
+        :returns ScheduledCall:
+            Handle for cancelling the calls
+        """
+        return self._schedule(ScheduledCall(
+            self, owner, callback, args, kwargs, interval, limit), interval)
+
+    def _schedule(self, call, delay):
+        """Insert a new call into the wheel and its owner's calls."""
+        self._insert(call, delay)
+        self._owned.setdefault(call.owner, set()).add(call)
+        return call
+
+    def _insert(self, call, delay):
+        """Insert a call into the slot it's due on after a delay."""
+        ticks = max(1, math.ceil(delay / self.tick_interval))
+        call._slot = (self._cursor + ticks) % self.size
+        call._rounds = (ticks - 1) // self.size
+        self._slots[call._slot].add(call)
+
+    def cancel(self, call):
+        """Cancel a scheduled call.
+
+        :param ScheduledCall call:
+            Handle of the call to cancel
+        """
+        if not call._active:
+            return
+        call._active = False
+        self._slots[call._slot].discard(call)
+        self._disown(call)
+
+    def cancel_owner(self, owner):
+        """Cancel all the calls of an owner.
+
+        :param object owner:
+            Owner whose calls to cancel
+        """
+        for call in self._owned.pop(owner, ()):
+            call._active = False
+            self._slots[call._slot].discard(call)
+
+    def clear(self):
+        """Cancel all the scheduled calls."""
+        for calls in self._owned.values():
+            for call in calls:
+                call._active = False
+        for calls in self._slots:
+            calls.clear()
+        self._owned.clear()
+
+    def _disown(self, call):
+        """Remove a call from its owner's calls."""
+        calls = self._owned.get(call.owner)
+        if calls is not None:
+            calls.discard(call)
+            if not calls:
+                del self._owned[call.owner]
+
+    def tick(self):
+        """Advance the wheel by a tick and run the calls which are due."""
+        self._cursor = (self._cursor + 1) % self.size
+        calls = self._slots[self._cursor]
+        if not calls:
+            return
+        self._slots[self._cursor] = set()
+        for call in calls:
+            if not call._active:
+                continue  # Cancelled by an earlier call on this tick
+            if call._rounds > 0:
+                call._rounds -= 1
+                self._slots[self._cursor].add(call)
+                continue
+            if call.limit is not None:
+                call.limit -= 1
+            if call.interval is None or call.limit == 0:
+                call._active = False
+                self._disown(call)
+            try:
+                call.callback(*call.args, **call.kwargs)
+            except Exception:
+                traceback.print_exc()
+            if call._active:
+                self._insert(call, call.interval)
+
+
+# Scheduler for the heroes' and skills' delayed effects, its tick
+# interval is set to the server's by the plugin when it's loaded
+scheduler = Scheduler(tick_interval=1 / 64)
@@ -4,8 +4,10 @@
 import importlib
 import inspect
 import pkgutil
+import weakref
 
 __all__ = (
+    'CachedClassProperty',
     'ClassProperty',
 )
 
@@ -79,6 +81,60 @@ class ClassProperty:
         return self.fget(type_)
 
 
+class CachedClassProperty(ClassProperty):
+    """Class property which calls :attr:`fget` only once per class.
+
+    The value is cached separately for every class accessing it,
+    so subclasses get their own values just like with
+    :class:`ClassProperty`, and subclasses which override the property
+    with a class attribute are unaffected. Should only be used for
+    values which don't change after the class has been created.
+
+    The values are kept in a plain dict keyed by the classes, as weak
+    references would make reading them slower than not caching at all.
+    The dict keeps the classes alive, so :meth:`clear_caches` must be
+    called when classes are replaced, e.g. after reloading the heroes.
+    """
+
+    # Every cached class property, for clearing all of their caches
+    _instances = weakref.WeakSet()
+
+    def __init__(self, fget=None, doc=None):
+        """Initialize the class property with a get function.
+
+        :param callable|None fget:
+            Function to call when the property is read the first time
+        :param str|None doc:
+            Docstring, automatically copied from ``fget`` if None
+        """
+        super().__init__(fget, doc)
+        self._values = {}
+        self._instances.add(self)
+
+    def __get__(self, obj=None, type_=None):
+        """Get the cached value, calling :attr:`fget` on the first read.
+
+        :param object obj:
+            Object accessing the class property (can be None)
+        :param type type_:
+            Class accessing the class property
+        """
+        if type_ is None:
+            type_ = type(obj)
+        try:
+            return self._values[type_]
+        except KeyError:
+            pass
+        value = self._values[type_] = self.fget(type_)
+        return value
+
+    @classmethod
+    def clear_caches(cls):
+        """Clear the cached values of every cached class property."""
+        for instance in cls._instances:
+            instance._values.clear()
+
+
 def get_classes_from_module(module, *, private=False, imported=False):
     """Yield classes from a module.
 
@@ -94,7 +150,7 @@ def get_classes_from_module(module, *, private=False, imported=False):
             continue
         if not inspect.isclass(obj):
             continue
-        if not imported and obj.__module__ == module.__name__:
+        if not imported and obj.__module__ != module.__name__:
             continue
         yield obj
 
@@ -1,18 +1,25 @@
 """Main entry point for the plugin."""
 
 # Python 3 imports
-import contextlib
+import collections
 
 # Source.Python imports
 from commands import CommandReturn
 from commands.client import ClientCommand
 from commands.say import SayCommand
+from commands.server import ServerCommand
+from engines.server import global_vars
 from events import Event
+from events.manager import event_registry
+from listeners import OnLevelShutdown
+from listeners import OnNetworkidValidated
+from listeners import OnTick
 from listeners.tick import TickRepeat
 from menus import ListMenu
 from menus import ListOption
 from menus import PagedMenu
 from menus import PagedOption
+from messages import KeyHintText
 from messages import SayText2
 from paths import PLUGIN_DATA_PATH
 from players.dictionary import PlayerDictionary
@@ -21,8 +28,16 @@ from translations.strings import LangStrings
 
 # Warcraft imports
 import warcraft.database
+import warcraft.event_args
 import warcraft.heroes
+import warcraft.hud
+import warcraft.journal
+import warcraft.listeners
 import warcraft.player
+import warcraft.profiler
+import warcraft.saving
+import warcraft.scheduler
+import warcraft.utilities
 
 
 # ======================================================================
@@ -32,15 +47,21 @@ import warcraft.player
 def _new_player(index):
     """Create a player and load his data from the database."""
     player = warcraft.player.Player(index)
-    steamid = player.steamid
 
-    # Load heroes
-    for hero_id, level, xp in database.get_heroes_data(steamid):
-        with contextlib.suppress(KeyError):
-            hero = player.heroes[hero_id] = heroes[hero_id](player, level, xp)
-            # And their skills
-            for skill_id, level in database.get_skills_data(steamid, hero_id):
-                hero.skills[skill_id].level = level
+    # Use a cached or a prefetched profile, or load it as a fallback
+    profile = profile_cache.get(player.steamid)
+    if profile is not None:
+        profile_prefetcher.discard(player.steamid)
+    else:
+        profile = profile_prefetcher.get(player.steamid)
+    if profile is None:
+        # The writer might still be retrying the player's previous data
+        profile = database_writer.load_profile(database, player.steamid)
+
+    # Add heroes to be created along with their skills once accessed
+    for hero_id, hero_data in profile.heroes.items():
+        if hero_id in heroes:
+            player.heroes.add_unloaded(heroes[hero_id], hero_data)
 
     # Give the player all heroes available by his total level
     total_level = player.calculate_total_level()
@@ -48,88 +69,180 @@ def _new_player(index):
         if hero_id in player.heroes:
             continue
         if hero_class.required_level <= total_level:
-            player.heroes[hero_id] = heroes[hero_id](player)
+            player.heroes.add_unloaded(hero_class)
 
-    # Set player's active hero
-    active_hero_id = database.get_active_hero_id(steamid)
-    if active_hero_id is not None:
-        player.hero = player.heroes[active_hero_id]
+    # Set player's active hero, leaving him dirty only if it's new
+    if profile.active_hero_id in player.heroes:
+        player.hero = player.heroes[profile.active_hero_id]
+        player.dirty = False
     else:
-        player.hero = next(iter(player.heroes.values()))
+        player.hero = player.heroes[next(iter(player.heroes))]
 
+    # Save the player already during the ongoing save cycle
+    _data_save_scheduler.add(index)
     return player
 
 
-def _serialize_player_data(player):
-    """Serialize player's data for other functions to save it."""
-    steamid = player.steamid
-    hero = player.hero
-    return (
-        # players
-        (steamid, hero.class_id),
-        # heroes
-        (steamid, hero.class_id, hero.level, hero.xp),
-        # skills
-        (
-            (steamid, hero.class_id, skill_id, skill.level)
-            for skill_id, skill in hero.skills.items()
+def _profile_from_player(player):
+    """Create a profile of player's current data for caching it."""
+    return warcraft.database.Profile(
+        player.steamid,
+        player.hero.class_id,
+        collections.OrderedDict(
+            (hero_id, player.heroes.get_data(hero_id))
+            for hero_id in player.heroes
         ),
     )
 
-def _save_player_data(player, *,  commit=True):
-    """Save individual player's data into the database."""
-    player_data, hero_data, skills_data = _serialize_player_data(player)
-    database.save_player(player_data)
-    database.save_hero(hero_data)
-    database.save_skills(skills_data)
-    if commit:
-        database.commit()
-
-
-def _save_all_data(*, commit=True):
-    """Save every active player's data into the database."""
-    datas = (_serialize_player_data(player) for player in players.values())
-    try:
-        players, heroes, skills_list = zip(*datas)
-    except ValueError:
-        return
-    skills = [skill for skills in skills_list for skill in skills]  # Flatten
-    database.save_players(players)
-    database.save_heroes(heroes)
-    database.save_skills(skills)
-    if commit:
-        database.commit()
+
+def _serialize_player_data(player):
+    """Serialize player's unsaved data for other functions to save it.
+
+    Only the rows of the player, heroes, and skills which have changed
+    since the previous save are serialized, after which they're
+    no longer considered dirty. Heroes which haven't been created
+    yet can't have changed, so they're skipped.
+    """
+    steamid = player.steamid
+    players_data = []
+    heroes_data = []
+    skills_data = []
+    if player.dirty:
+        players_data.append((steamid, player.hero.class_id))
+        player.dirty = False
+    for hero_id, hero in player.heroes.loaded_items():
+        if hero.dirty:
+            heroes_data.append((steamid, hero_id, hero.level, hero.xp))
+            hero.dirty = False
+        for skill_id, skill in hero.skills.items():
+            if skill.dirty:
+                skills_data.append((steamid, hero_id, skill_id, skill.level))
+                skill.dirty = False
+    return players_data, heroes_data, skills_data
+
+
+def _save_player_data(player):
+    """Queue individual player's unsaved data to the database."""
+    players_data, heroes_data, skills_data = _serialize_player_data(player)
+    if players_data or heroes_data or skills_data:
+        # Journal must never be behind the data in the database
+        journal.flush()
+        database_writer.put(
+            player.steamid, players_data, heroes_data, skills_data)
+
+
+def _save_indexed_player_data(index):
+    """Queue a player's unsaved data by index, if he's still there."""
+    player = players.get(index)
+    if player is not None:
+        _save_player_data(player)
+
+
+def _save_all_data():
+    """Queue every active player's unsaved data to the database."""
+    for player in players.values():
+        _save_player_data(player)
 
 
 def unload():
     """Store players' data and close the database."""
-    _data_save_repeat.stop()
+    for game_event in _registered_game_events:
+        event_registry.unregister_for_event(
+            game_event, _game_event_sources[game_event][0])
+    _journal_flush_repeat.stop()
+    _cooldown_hud_repeat.stop()
+    _journal_compact_repeat.stop()
+    warcraft.scheduler.scheduler.clear()
+    profile_prefetcher.close()
     _save_all_data()
+    journal.compact(database_writer)
+    database_writer.close()
+    journal.close()
     database.close()
 
 
+@warcraft.listeners.OnHeroXpChange
+def _journal_hero_xp(hero, player, amount):
+    """Record a hero's new level and xp into the journal."""
+    journal.record_hero(player.steamid, hero)
+
+
+@warcraft.listeners.OnSkillUpgrade
+def _journal_skill_upgrade(skill, hero, player):
+    """Record an upgraded skill's new level into the journal."""
+    journal.record_skill(player.steamid, hero, skill)
+
+
+@warcraft.listeners.OnSkillDowngrade
+def _journal_skill_downgrade(skill, hero, player):
+    """Record a downgraded skill's new level into the journal."""
+    journal.record_skill(player.steamid, hero, skill)
+
+
+def _save_and_cache_player_data(player):
+    """Save player's data and cache his profile for a possible return."""
+    _save_player_data(player)
+    profile_cache.put(_profile_from_player(player))
+
+
+@OnTick
+def _save_data_gradually():
+    """Save a few players' data on each tick."""
+    _data_save_scheduler.tick()
+
+
+@OnNetworkidValidated
+def _prefetch_player_data(name, networkid):
+    """Start loading player's data as soon as his SteamID is known."""
+    if networkid not in profile_cache:
+        profile_prefetcher.prefetch(networkid)
+
+
 @Event('player_disconnect')
 def _save_disconnecters_data(event):
     """Save player's data upon disconnect."""
+    profile_prefetcher.discard(event['networkid'])
     index = index_from_userid(event['userid'])
     if index not in players:
         return
-    _save_player_data(players[index])
+    player = players[index]
+    # Executed here rather than through the event registry, so that
+    # the skills run before the player is saved and removed
+    _execute_player_skills(player, event)
+    player.hero.cancel_scheduled_calls()
+    _save_and_cache_player_data(player)
     del players[index]
+    cooldown_hud.forget(index)
+
+
+@OnLevelShutdown
+def _save_map_changers_data():
+    """Save everyone's data before the map changes.
+
+    The players are rebuilt from the cached profiles once they're
+    accessed on the next map.
+    """
+    for player in players.values():
+        _save_and_cache_player_data(player)
+    players.clear()
+    cooldown_hud.clear()
+    warcraft.scheduler.scheduler.clear()
 
 
 # ======================================================================
 # >> SKILL EXECUTION CALLBACKS
 # ======================================================================
 
-@Event('player_jump', 'player_spawn', 'player_disconnect')
 def _execute_individual_skills(event):
     """Execute skills for events with only one player."""
-    event_args = event.variables.as_dict()
-    player = players.from_userid(event_args.pop('userid'))
+    _execute_player_skills(players.from_userid(event['userid']), event)
+
+
+def _execute_player_skills(player, event):
+    """Execute a player's skills for an event with only him."""
     if player.team in (2, 3):
-        event_args['player'] = player
-        player.hero.execute_skills(event.name, event_args)
+        player.hero.execute_skills(
+            event.name, warcraft.event_args.EventArgs(event, player=player))
 
 
 # Converter from event's name to attacker's and victim's event names
@@ -139,24 +252,83 @@ _event_name_conversions = {
 }
 
 
-@Event('player_death', 'player_hurt')
 def _execute_interaction_skills(event):
     """Execute skills for events with two players."""
-    if not event['attacker'] or event['attacker'] == event['userid']:
+    attacker_userid = event['attacker']
+    victim_userid = event['userid']
+    if not attacker_userid or attacker_userid == victim_userid:
         return
-    event_args = event.variables.as_dict()
 
-    attacker = players.from_userid(event_args.pop('attacker'))
-    victim = players.from_userid(event_args.pop('userid'))
-    event_args.update(attacker=attacker, victim=victim)
+    attacker = players.from_userid(attacker_userid)
+    victim = players.from_userid(victim_userid)
+    event_args = warcraft.event_args.EventArgs(
+        event, player=attacker, attacker=attacker, victim=victim)
 
     event_names = _event_name_conversions[event.name]
-    event_args['player'] = attacker
     attacker.hero.execute_skills(event_names[0], event_args)
     event_args['player'] = victim
     victim.hero.execute_skills(event_names[1], event_args)
 
 
+# Game events which skills can use, and the skill events they provide
+# (player_disconnect is always executed by _save_disconnecters_data)
+_game_event_sources = {
+    'player_jump': (_execute_individual_skills, ('player_jump',)),
+    'player_spawn': (_execute_individual_skills, ('player_spawn',)),
+    'player_death': (
+        _execute_interaction_skills, _event_name_conversions['player_death']),
+    'player_hurt': (
+        _execute_interaction_skills, _event_name_conversions['player_hurt']),
+}
+
+# Game events currently registered for executing skills
+_registered_game_events = set()
+
+
+def _update_skill_event_registrations():
+    """Register only the game events which some skill has callbacks for.
+
+    Must be called whenever :data:`heroes` changes, such as after
+    ``wcs_reload_heroes``, so that the newly needed events get
+    registered and the no longer needed ones get unregistered.
+    """
+    skill_events = set()
+    for hero_info in heroes.values():
+        for skill_info in hero_info.skill_classes:
+            skill_events.update(skill_info.events)
+
+    for game_event, (callback, provided_events) in _game_event_sources.items():
+        needed = not skill_events.isdisjoint(provided_events)
+        if needed and game_event not in _registered_game_events:
+            event_registry.register_for_event(game_event, callback)
+            _registered_game_events.add(game_event)
+        elif not needed and game_event in _registered_game_events:
+            event_registry.unregister_for_event(game_event, callback)
+            _registered_game_events.remove(game_event)
+
+
+# ======================================================================
+# >> SCHEDULED CALLS
+# ======================================================================
+
+@OnTick
+def _run_scheduled_calls():
+    """Run the heroes' and skills' calls which are due on this tick."""
+    warcraft.scheduler.scheduler.tick()
+
+
+@Event('player_death')
+def _cancel_victims_scheduled_calls(event):
+    """Cancel the dead player's hero's and skills' scheduled calls.
+
+    Registered before the skill execution callbacks, so the skills'
+    own ``player_death`` callbacks can still schedule new calls.
+    """
+    index = index_from_userid(event['userid'])
+    if index in players:
+        players[index].hero.cancel_scheduled_calls()
+
+
 # ======================================================================
 # >> EXPERIENCE POINT CALLBACKS
 # ======================================================================
@@ -188,6 +360,17 @@ def _send_level_up_message(hero, player, levels):
     _level_up_message.send(player.index, hero=hero)
 
 
+def _update_cooldown_hud():
+    """Show the human players their skills' remaining cooldowns."""
+    cooldown_hud.update(
+        player for player in players.values() if player.steamid != 'BOT')
+
+
+def _send_cooldown_hud(player, text):
+    """Send a player his cooldown HUD's text."""
+    KeyHintText(text).send(player.index)
+
+
 # ======================================================================
 # >> CLIENT/SAY COMMANDS
 # ======================================================================
@@ -223,22 +406,116 @@ def _heroinfo_command_callback(command, player_index, only=None):
     return CommandReturn.BLOCK
 
 
+# ======================================================================
+# >> SERVER COMMANDS
+# ======================================================================
+
+@ServerCommand('wcs_profile')
+def _profile_command_callback(command):
+    """Control the skill profiler.
+
+    Usage: ``wcs_profile <on|off|reset|print|write> [amount]``, where
+    ``print`` prints the ``amount`` (default 10) most time consuming
+    skill callbacks and ``write`` writes them into a file instead.
+    """
+    profiler = warcraft.profiler.skill_profiler
+    args = command.arg_string.split()
+    action = args[0] if args else 'print'
+    limit = int(args[1]) if len(args) > 1 and args[1].isdigit() else 10
+    if action == 'on':
+        profiler.enable()
+        print('[Warcraft] Skill profiler enabled.')
+    elif action == 'off':
+        profiler.disable()
+        print('[Warcraft] Skill profiler disabled.')
+    elif action == 'reset':
+        profiler.reset()
+        print('[Warcraft] Skill profiler reset.')
+    elif action == 'print':
+        print(profiler.format_report(limit))
+    elif action == 'write':
+        path = PLUGIN_DATA_PATH / 'warcraft_profile.txt'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(profiler.format_report(limit))
+            file.write('\n')
+        print('[Warcraft] Skill profile written to {0}.'.format(path))
+    else:
+        print('Usage: wcs_profile <on|off|reset|print|write> [amount]')
+
+
+def _load_heroes():
+    """Fill :data:`heroes` with the heroes from the hero manifest."""
+    hero_infos = warcraft.heroes.get_lazy_heroes(
+        PLUGIN_DATA_PATH / 'warcraft_heroes.json')
+    heroes.clear()
+    heroes.update(
+        (hero_info.class_id, hero_info) for hero_info in hero_infos)
+
+
+@ServerCommand('wcs_reload_heroes')
+def _reload_heroes_command_callback(command):
+    """Reload the heroes' information from the hero modules.
+
+    New, changed, and removed hero modules are picked up and the game
+    events are re-registered for the skills. Heroes which the players
+    have already created keep using their old classes until the
+    players reconnect.
+    """
+    _load_heroes()
+    warcraft.utilities.CachedClassProperty.clear_caches()
+    _update_skill_event_registrations()
+    print('[Warcraft] Reloaded {0} heroes.'.format(len(heroes)))
+
+
 # ======================================================================
 # >> GLOBALS
 # ======================================================================
 
+# Run the scheduled calls on the server's tick rate
+warcraft.scheduler.scheduler.tick_interval = global_vars.interval_per_tick
+
 # A dictionary of all the players, uses indexes as keys
 players = PlayerDictionary(_new_player)
 
-# A dictionary of the heroes from heroes.__init__.get_heroes
-heroes = {hero.class_id: hero for hero in warcraft.heroes.get_heroes()}
+# A dictionary of the heroes' information from the hero manifest,
+# each hero's module gets imported once the hero is first created
+heroes = {}
+_load_heroes()
+_update_skill_event_registrations()
 
-# Database wrapper for accessing the Warcraft database
+# Database wrapper for accessing the Warcraft database, replace
+# SQLite with MemorySQLite to keep recently used players in memory
 database = warcraft.database.SQLite(PLUGIN_DATA_PATH / 'warcraft.db')
 
-# A tick repeat for saving everyone's data every 4 minutes
-_data_save_repeat = TickRepeat(_save_all_data)
-_data_save_repeat.start(240, 0)
+# Journal of heroes' progress between saves, replayed after a crash
+journal = warcraft.journal.Journal(
+    PLUGIN_DATA_PATH / 'warcraft.journal', database)
+
+# Background thread for writing players' data into the database
+database_writer = warcraft.database.Writer(database)
+
+# Background thread for loading players' data as they connect
+profile_prefetcher = warcraft.database.Prefetcher(database, database_writer)
+
+# Recently departed players' profiles, for when they join back
+profile_cache = warcraft.database.ProfileCache(database_writer)
+
+# Saves everyone's data every 4 minutes, a few players per tick
+_data_save_scheduler = warcraft.saving.SaveScheduler(
+    _save_indexed_player_data, lambda: list(players),
+    interval=240, time_budget=0.002)
+
+# Tick repeats for flushing the journal every second and compacting
+# it into the database every minute
+_journal_flush_repeat = TickRepeat(journal.flush)
+_journal_flush_repeat.start(1, 0)
+_journal_compact_repeat = TickRepeat(journal.compact, database_writer)
+_journal_compact_repeat.start(60, 0)
+
+# Shows players their skills' cooldowns, sampled twice a second
+cooldown_hud = warcraft.hud.CooldownHud(_send_cooldown_hud, interval=0.5)
+_cooldown_hud_repeat = TickRepeat(_update_cooldown_hud)
+_cooldown_hud_repeat.start(cooldown_hud.interval, 0)
 
 # Translations for the Warcraft plugin
 _tr = LangStrings('warcraft')
@@ -285,7 +562,7 @@ def _on_change_hero_menu_build(menu, player_index):
     total_level = player.calculate_total_level()
     for hero_id, hero_class in heroes.items():
         if hero_class.required_level <= total_level:
-            level = player.heroes[hero_id].level if hero_id in player.heroes else 0
+            level = player.heroes.get_level(hero_id) if hero_id in player.heroes else 0
             text = _tr['Owned Hero Text'].get_string(name=hero_class.name, level=level)
             menu.append(PagedOption(text, hero_class, True, True))
         else:
@@ -0,0 +1,57 @@
+"""Benchmark of reading entities' cached class properties.
+
+Times reading :class:`warcraft.entities.entity.Entity`'s ``class_id``,
+``name``, and ``description`` through an instance, with the properties
+cached by :class:`warcraft.utilities.CachedClassProperty` and with
+plain :class:`warcraft.utilities.ClassProperty` ones.
+
+Requires Source.Python, run with:
+``python tests/bench_class_properties.py``
+"""
+
+# Python 3 imports
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+# Warcraft imports
+from warcraft.entities.entity import Entity
+from warcraft.utilities import ClassProperty
+
+
+class Cached_Entity(Entity):
+    """Entity with the cached class properties."""
+
+
+class Uncached_Entity(Entity):
+    """Entity with plain class properties."""
+
+    class_id = ClassProperty(lambda cls: cls.__qualname__)
+    name = ClassProperty(lambda cls: cls.__name__.replace('_', ' '))
+    description = ClassProperty(lambda cls: cls.__doc__)
+
+
+def _time(entity, attribute, number, repeat):
+    """Get the best time of reading an attribute in nanoseconds."""
+    return min(timeit.repeat(
+        'entity.' + attribute, globals={'entity': entity},
+        number=number, repeat=repeat)) / number * 1e9
+
+
+def main(number=10 ** 6, repeat=5):
+    cached = Cached_Entity(None)
+    uncached = Uncached_Entity(None)
+    print('{0:<12} {1:>14} {2:>20}'.format(
+        'attribute', 'ClassProperty', 'CachedClassProperty'))
+    for attribute in ('class_id', 'name', 'description'):
+        print('{0:<12} {1:>11.1f} ns {2:>17.1f} ns'.format(
+            attribute, _time(uncached, attribute, number, repeat),
+            _time(cached, attribute, number, repeat)))
+
+
+if __name__ == '__main__':
+    main()
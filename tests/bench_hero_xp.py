@@ -0,0 +1,47 @@
+"""Benchmark of heroes' closed-form level solving against the loop.
+
+Times giving and taking amounts of xp worth different amounts of
+levels, for a hero with the default xp quota, whose levels are solved
+at once, and for a hero with a custom quota, whose levels are gone
+through one at a time.
+
+Requires Source.Python, run with: ``python tests/bench_hero_xp.py``
+"""
+
+# Python 3 imports
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Test imports
+from test_hero_xp import ClosedFormHero
+from test_hero_xp import LoopHero
+
+
+def _time(function, number):
+    """Get the average time of a function call in microseconds."""
+    return timeit.timeit(function, number=number) / number * 1e6
+
+
+def main(number=200):
+    print('{0:>9} {1:>7} {2:>12} {3:>12} {4:>12} {5:>12}'.format(
+        'xp', 'levels', 'give loop', 'give closed',
+        'take loop', 'take closed'))
+    for amount in (1000, 100000, 10 ** 7):
+        hero = LoopHero(None)
+        hero.give_xp(amount)
+        level = hero.level
+        print('{0:>9} {1:>7} {2:>9.1f} us {3:>9.1f} us '
+              '{4:>9.1f} us {5:>9.1f} us'.format(
+                  amount, level,
+                  _time(lambda: LoopHero(None).give_xp(amount), number),
+                  _time(lambda: ClosedFormHero(None).give_xp(amount), number),
+                  _time(lambda: LoopHero(None, level).take_xp(amount), number),
+                  _time(lambda: ClosedFormHero(None, level).take_xp(amount),
+                        number)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""A fake DB-API driver for testing the MySQL connection handling.
+
+Connections are made to a :class:`Server`, whose data is stored in
+an SQLite database file, and they can be dropped at will to simulate
+losing the connection to a MySQL server, e.g. to its ``wait_timeout``.
+"""
+
+# Python 3 imports
+import sqlite3
+
+__all__ = (
+    'Connection',
+    'Cursor',
+    'InterfaceError',
+    'OperationalError',
+    'Server',
+)
+
+
+class OperationalError(Exception):
+    """Raised when a query loses the connection to the server."""
+
+
+class InterfaceError(Exception):
+    """Raised when a dropped connection is used."""
+
+
+class Server:
+    """Fake database server which keeps track of its connections.
+
+    Setting :attr:`fail_queries` makes that many upcoming queries
+    drop their connection instead of executing.
+    """
+
+    def __init__(self, path):
+        """Initialize the server.
+
+        :param str path:
+            Path to the SQLite database file to store the data in
+        """
+        self.path = str(path)
+        self.connections = []
+        self.fail_queries = 0
+
+    def connect(self):
+        """Open a new connection to the server."""
+        connection = Connection(self)
+        self.connections.append(connection)
+        return connection
+
+    def drop_connections(self):
+        """Drop every connection, as if the server had restarted."""
+        for connection in self.connections:
+            connection.drop()
+
+    @property
+    def open_connections(self):
+        """Get the connections which are still open."""
+        return [connection for connection in self.connections
+                if connection.open]
+
+
+class Connection:
+    """Connection to a :class:`Server` with pymysql's interface."""
+
+    def __init__(self, server):
+        self.server = server
+        self.open = True
+        self.pings = 0
+        self._db = sqlite3.connect(server.path, check_same_thread=False)
+
+    def _check(self):
+        if not self.open:
+            raise InterfaceError(0, '')
+
+    def drop(self):
+        """Drop the connection, rolling back its uncommitted changes."""
+        if self.open:
+            self.open = False
+            self._db.rollback()
+            self._db.close()
+
+    def ping(self, reconnect=True):
+        self.pings += 1
+        if not self.open:
+            raise OperationalError(2006, 'MySQL server has gone away')
+
+    def cursor(self, cursor_class=None):
+        self._check()
+        return Cursor(self)
+
+    def commit(self):
+        self._check()
+        self._db.commit()
+
+    def rollback(self):
+        self._check()
+        self._db.rollback()
+
+    def close(self):
+        self.drop()
+
+
+class Cursor:
+    """Cursor of a :class:`Connection`, usable as a context manager."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection._db.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _execute(self, method, query, args):
+        self._connection._check()
+        server = self._connection.server
+        if server.fail_queries > 0:
+            server.fail_queries -= 1
+            self._connection.drop()
+            raise OperationalError(
+                2013, 'Lost connection to MySQL server during query')
+        method(query.replace('%s', '?'), args)
+
+    def execute(self, query, args=()):
+        self._execute(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        self._execute(self._cursor.executemany, query, list(args))
+
+    def fetchone(self):
+        self._connection._check()
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        self._connection._check()
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        self._connection._check()
+        return self._cursor.fetchall()
+
+    def close(self):
+        if self._connection.open:
+            self._cursor.close()
@@ -0,0 +1,165 @@
+"""Tests for reconnecting and retrying lost MySQL connections.
+
+Uses the fake DB-API driver from :mod:`fake_dbapi` in place of pymysql.
+"""
+
+# Python 3 imports
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+# Warcraft imports
+from warcraft.database import ConnectionPool
+from warcraft.database import MySQL
+
+# Test imports
+import fake_dbapi
+
+
+class FakeMySQL(MySQL):
+    """MySQL database connecting through the fake driver."""
+
+    def _connect(self, server, **kwargs):
+        return ConnectionPool(
+            server.connect,
+            errors=(fake_dbapi.OperationalError, fake_dbapi.InterfaceError),
+            **kwargs)
+
+
+class _ServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+        self.server = fake_dbapi.Server(
+            os.path.join(self._tempdir.name, 'warcraft.db'))
+        self.addCleanup(self.server.drop_connections)
+
+
+class ConnectionPoolTest(_ServerTestCase):
+
+    def test_thread_keeps_its_connection(self):
+        pool = ConnectionPool(self.server.connect)
+        self.assertIs(pool.connection(), pool.connection())
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_threads_get_their_own_connections(self):
+        pool = ConnectionPool(self.server.connect)
+        connections = []
+        thread = threading.Thread(
+            target=lambda: connections.append(pool.connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(pool.connection(), connections[0])
+
+    def test_released_connection_is_reused(self):
+        pool = ConnectionPool(self.server.connect)
+        connection = pool.connection()
+        pool.release()
+        self.assertIs(pool.connection(), connection)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_released_connection_is_closed_beyond_max_idle(self):
+        pool = ConnectionPool(self.server.connect, max_idle=0)
+        connection = pool.connection()
+        pool.release()
+        self.assertFalse(connection.open)
+
+    def test_idle_connection_is_not_pinged_within_interval(self):
+        pool = ConnectionPool(self.server.connect, ping_interval=60)
+        connection = pool.connection()
+        pool.connection()
+        self.assertEqual(connection.pings, 0)
+
+    def test_dropped_idle_connection_is_replaced(self):
+        pool = ConnectionPool(
+            self.server.connect, errors=(fake_dbapi.OperationalError,),
+            ping_interval=0)
+        connection = pool.connection()
+        connection.drop()
+        new_connection = pool.connection()
+        self.assertGreater(connection.pings, 0)
+        self.assertIsNot(new_connection, connection)
+        self.assertTrue(new_connection.open)
+
+    def test_statements_are_cached_per_connection(self):
+        pool = ConnectionPool(
+            self.server.connect, errors=(fake_dbapi.OperationalError,),
+            ping_interval=0)
+        pool.statements()['query'] = 'statement'
+        pool.connection().drop()
+        self.assertEqual(pool.statements(), {})
+
+    def test_close_closes_idle_connections(self):
+        pool = ConnectionPool(self.server.connect)
+        pool.connection()
+        pool.release()
+        pool.close()
+        self.assertEqual(self.server.open_connections, [])
+
+
+class MySQLRetryTest(_ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.database = FakeMySQL(self.server)
+        self.addCleanup(self.database.close)
+
+    def test_save_data_is_retried_on_a_new_connection(self):
+        self.server.fail_queries = 2
+        self.database.save_data(
+            [('1', 'hero')], [('1', 'hero', 2, 30)],
+            [('1', 'hero', 'skill', 1)])
+        profile = self.database.load_profile('1')
+        self.assertEqual(profile.active_hero_id, 'hero')
+        self.assertEqual(profile.heroes['hero'].level, 2)
+        self.assertEqual(profile.heroes['hero'].skills, {'skill': 1})
+        self.assertEqual(len(self.server.open_connections), 1)
+
+    def test_dropped_save_is_rolled_back_before_retrying(self):
+        self.database.save_data([('1', 'hero')], [], [])
+        self.server.fail_queries = 1
+        self.database.save_data([('1', 'other')], [('1', 'other', 1, 0)], [])
+        profile = self.database.load_profile('1')
+        self.assertEqual(profile.active_hero_id, 'other')
+        self.assertEqual(list(profile.heroes), ['other'])
+
+    def test_load_profile_is_retried(self):
+        self.database.save_data([('1', 'hero')], [], [])
+        self.server.drop_connections()
+        profile = self.database.load_profile('1')
+        self.assertEqual(profile.active_hero_id, 'hero')
+
+    def test_gives_up_after_retries(self):
+        self.server.fail_queries = self.database.retries + 1
+        with self.assertRaises(fake_dbapi.OperationalError):
+            self.database.save_data([('1', 'hero')], [], [])
+        self.assertEqual(self.database.load_profile('1').active_hero_id, None)
+
+    def test_clone_releases_its_connection_to_the_pool(self):
+        clone = self.database.clone()
+        results = []
+
+        def load():
+            results.append(clone.load_profile('1'))
+            clone.close()
+
+        thread = threading.Thread(target=load)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(len(self.server.open_connections), 2)
+        self.assertEqual(len(self.database._connection._idle), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
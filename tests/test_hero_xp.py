@@ -0,0 +1,129 @@
+"""Tests for the closed-form level solving of heroes' xp.
+
+The heroes' default xp quota lets :meth:`warcraft.entities.Hero.give_xp`
+and :meth:`warcraft.entities.Hero.take_xp` solve the amount of levels
+gained or lost at once, while heroes with a custom quota go through
+the levels one at a time. Both must end up with the same results.
+
+Requires Source.Python, which provides the listeners the heroes notify.
+"""
+
+# Python 3 imports
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+try:
+    import listeners
+except ImportError:
+    raise unittest.SkipTest('Source.Python is not available')
+
+# Warcraft imports
+from warcraft.entities import Hero
+from warcraft.entities.hero import _levels_gained
+from warcraft.entities.hero import _levels_lost
+from warcraft.entities.hero import _quota_sum
+import warcraft.listeners
+
+
+class ClosedFormHero(Hero):
+    """Hero which solves its levels with the closed form."""
+
+
+class LoopHero(Hero):
+    """Hero which goes through its levels one at a time."""
+
+    @property
+    def xp_quota(self):
+        if self.on_max_level():
+            return math.inf
+        return 80 + 15 * self.level
+
+
+class MaxLevelClosedFormHero(ClosedFormHero):
+    max_level = 20
+
+
+class MaxLevelLoopHero(LoopHero):
+    max_level = 20
+
+
+class LevelSolvingTest(unittest.TestCase):
+
+    def test_levels_gained_is_largest_affordable(self):
+        for level in range(0, 200, 7):
+            for xp in range(0, 50000, 97):
+                levels = _levels_gained(level, xp, math.inf)
+                self.assertLessEqual(_quota_sum(level, levels), xp)
+                self.assertGreater(_quota_sum(level, levels + 1), xp)
+
+    def test_levels_gained_respects_max_levels(self):
+        self.assertEqual(_levels_gained(0, 10 ** 9, 5), 5)
+        self.assertEqual(_levels_gained(0, 10 ** 9, 0), 0)
+
+    def test_levels_lost_is_smallest_covering(self):
+        for level in range(1, 200, 7):
+            for deficit in range(1, _quota_sum(0, level), 97):
+                levels = _levels_lost(level, deficit)
+                self.assertGreaterEqual(
+                    _quota_sum(level - levels, levels), deficit)
+                self.assertLess(
+                    _quota_sum(level - levels + 1, levels - 1), deficit)
+
+    def test_levels_lost_is_capped_to_level(self):
+        self.assertEqual(_levels_lost(3, 10 ** 9), 3)
+
+
+class HeroXpEquivalenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self._listeners = (
+            (warcraft.listeners.OnHeroLevelUp.manager,
+                lambda **kwargs: self.events.append(('up', kwargs['levels']))),
+            (warcraft.listeners.OnHeroLevelDown.manager,
+                lambda **kwargs: self.events.append(
+                    ('down', kwargs['levels']))),
+        )
+        for manager, listener in self._listeners:
+            manager.register_listener(listener)
+            self.addCleanup(manager.unregister_listener, listener)
+
+    def _change(self, hero, method, amount):
+        """Change a hero's xp and get its state and the notifications."""
+        self.events = []
+        getattr(hero, method)(amount)
+        return hero.level, hero.xp, self.events
+
+    def test_closed_form_matches_loop(self):
+        rng = random.Random(1)
+        for _ in range(20000):
+            closed_class, loop_class = rng.choice((
+                (ClosedFormHero, LoopHero),
+                (MaxLevelClosedFormHero, MaxLevelLoopHero),
+            ))
+            level = rng.randint(0, 20)
+            xp = rng.randint(0, 80 + 15 * level - 1)
+            closed_hero = closed_class(None, level, xp)
+            loop_hero = loop_class(None, level, xp)
+            for _ in range(3):
+                amount = rng.choice((
+                    rng.randint(0, 200),
+                    rng.randint(0, 100000),
+                    rng.randint(0, 10 ** 7),
+                ))
+                method = rng.choice(('give_xp', 'take_xp'))
+                self.assertEqual(
+                    self._change(closed_hero, method, amount),
+                    self._change(loop_hero, method, amount),
+                    (closed_class.__name__, level, xp, method, amount))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""Tests for compacting the heroes' progress journal into a database."""
+
+# Python 3 imports
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+# Warcraft imports
+from warcraft.journal import Journal
+
+
+class _Database:
+    """Database which records the saved heroes and can fail to save."""
+
+    def __init__(self):
+        self.heroes = {}
+        self.failures = 0
+        self.persists = 0
+
+    def save_data(self, players_data, heroes_data, skills_data):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError('Database is down')
+        for row in heroes_data:
+            self.heroes[row[:2]] = row[2:]
+
+    def persist(self):
+        self.persists += 1
+
+
+class _Writer:
+    """Writer which calls the functions at once, like its thread would."""
+
+    def __init__(self, database):
+        self.database = database
+        self.calls = []
+
+    def call(self, function):
+        self.calls.append(function)
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        for function in calls:
+            try:
+                function(self.database)
+            except RuntimeError:
+                pass
+
+
+class _Hero:
+
+    def __init__(self, class_id, level, xp):
+        self.class_id = class_id
+        self.level = level
+        self.xp = xp
+
+
+class JournalCompactTest(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, 'warcraft.journal')
+        self.database = _Database()
+        self.writer = _Writer(self.database)
+        self.journal = Journal(self.path, self.database)
+        self.addCleanup(self.journal.close)
+
+    def test_compact_folds_the_latest_records(self):
+        self.journal.record_hero('1', _Hero('hero', 1, 10))
+        self.journal.record_hero('1', _Hero('hero', 2, 5))
+        self.journal.compact(self.writer)
+        self.writer.run()
+        self.assertEqual(self.database.heroes, {('1', 'hero'): (2, 5)})
+        self.assertEqual(self.database.persists, 1)
+        self.assertFalse(os.path.exists(self.path + '.compacting'))
+
+    def test_compact_waits_for_the_previous_fold(self):
+        self.journal.record_hero('1', _Hero('hero', 1, 10))
+        self.journal.compact(self.writer)
+        self.journal.record_hero('1', _Hero('hero', 2, 5))
+        self.journal.compact(self.writer)
+        self.assertEqual(len(self.writer.calls), 1)
+
+    def test_failed_fold_is_retried_with_the_new_records(self):
+        self.journal.record_hero('1', _Hero('hero', 1, 10))
+        self.journal.record_hero('2', _Hero('hero', 3, 0))
+        self.database.failures = 1
+        self.journal.compact(self.writer)
+        self.writer.run()
+        self.assertEqual(self.database.heroes, {})
+        self.assertTrue(os.path.exists(self.path + '.compacting'))
+
+        self.journal.record_hero('1', _Hero('hero', 2, 5))
+        self.journal.compact(self.writer)
+        self.writer.run()
+        self.assertEqual(self.database.heroes, {
+            ('1', 'hero'): (2, 5),
+            ('2', 'hero'): (3, 0),
+        })
+        self.assertFalse(os.path.exists(self.path + '.compacting'))
+
+    def test_failed_fold_is_replayed_on_restart(self):
+        self.journal.record_hero('1', _Hero('hero', 1, 10))
+        self.database.failures = 1
+        self.journal.compact(self.writer)
+        self.writer.run()
+        self.journal.close()
+        self.journal = Journal(self.path, self.database)
+        self.assertEqual(self.database.heroes, {('1', 'hero'): (1, 10)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Tests for spreading periodic saves with :class:`SaveScheduler`."""
+
+# Python 3 imports
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+# Warcraft imports
+from warcraft.saving import SaveScheduler
+
+
+class SaveSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.players = {1: 'a', 2: 'b', 3: 'c'}
+        self.saved = []
+        self.scheduler = SaveScheduler(
+            self._save, lambda: list(self.players), interval=60)
+
+    def _save(self, index):
+        player = self.players.get(index)
+        if player is not None:
+            self.saved.append(player)
+
+    def _advance(self, seconds):
+        """Pretend that time has passed and tick the scheduler."""
+        self.scheduler._cycle_start -= seconds
+        self.scheduler.tick()
+
+    def test_saves_nothing_before_the_interval(self):
+        self._advance(30)
+        self.assertEqual(self.saved, [])
+
+    def test_saves_every_target_once_per_cycle(self):
+        self._advance(60)
+        self._advance(60)
+        self.assertEqual(self.saved, ['a', 'b', 'c'])
+
+    def test_saves_only_the_due_part_of_a_cycle(self):
+        self._advance(60)
+        self._advance(30)
+        self.assertEqual(self.saved, ['a', 'b'])
+
+    def test_targets_gone_mid_cycle_are_skipped(self):
+        self._advance(60)
+        del self.players[1]
+        self.players[4] = 'd'
+        self.scheduler.add(4)
+        self._advance(60)
+        self.assertEqual(self.saved, ['b', 'c', 'd'])
+
+    def test_targets_already_in_the_cycle_are_not_added(self):
+        self._advance(60)
+        self.scheduler.add(2)
+        self._advance(60)
+        self.assertEqual(self.saved, ['a', 'b', 'c'])
+
+    def test_targets_are_not_added_between_cycles(self):
+        self.scheduler.add(1)
+        self.assertEqual(len(self.scheduler._queue), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for executing skills' callbacks through their heroes' index.
+
+Requires Source.Python, which provides the listeners the heroes notify.
+"""
+
+# Python 3 imports
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+try:
+    import listeners
+except ImportError:
+    raise unittest.SkipTest('Source.Python is not available')
+
+# Warcraft imports
+from warcraft.entities import Hero
+from warcraft.entities import Skill
+from warcraft.entities import callback
+
+
+class Recording_Skill(Skill):
+    """Skill which records its callbacks' calls."""
+
+    @callback('player_spawn', 'player_jump')
+    def _record(self, calls, **eargs):
+        calls.append((self.class_id, eargs['event']))
+
+
+class Executing_Skill(Recording_Skill):
+    """Skill which executes its callbacks only for spawns."""
+
+    def execute(self, event_name, event_args):
+        if event_name == 'player_spawn':
+            super().execute(event_name, event_args)
+
+
+class Skilled_Hero(Hero):
+    """Hero with a recording and an executing skill."""
+
+    max_level = 10
+
+
+Skilled_Hero.skill(Recording_Skill)
+Skilled_Hero.skill(Executing_Skill)
+
+
+class SkillCallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hero = Skilled_Hero(None, level=10)
+        self.calls = []
+
+    def _execute(self, event_name):
+        self.hero.execute_skills(
+            event_name, {'calls': self.calls, 'event': event_name})
+
+    def test_only_upgraded_skills_are_executed(self):
+        self._execute('player_spawn')
+        self.assertEqual(self.calls, [])
+        self.hero.skills['Recording_Skill'].level = 1
+        self._execute('player_spawn')
+        self.assertEqual(
+            self.calls, [('Recording_Skill', 'player_spawn')])
+
+    def test_overridden_execute_is_called(self):
+        for skill in self.hero.skills.values():
+            skill.level = 1
+        self._execute('player_spawn')
+        self._execute('player_jump')
+        self.assertEqual(self.calls, [
+            ('Recording_Skill', 'player_spawn'),
+            ('Executing_Skill', 'player_spawn'),
+            ('Recording_Skill', 'player_jump'),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
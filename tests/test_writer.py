@@ -0,0 +1,119 @@
+"""Tests for keeping players' data which fails to be written."""
+
+# Python 3 imports
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'srcds', 'addons', 'source-python', 'plugins'))
+
+# Warcraft imports
+from warcraft.database import Profile
+from warcraft.database import ProfileCache
+from warcraft.database import SQLite
+from warcraft.database import Writer
+
+
+class FlakySQLite(SQLite):
+    """SQLite database which fails to save while :attr:`failures` > 0."""
+
+    failures = 0
+
+    def save_data(self, players_data, heroes_data, skills_data):
+        if FlakySQLite.failures > 0:
+            FlakySQLite.failures -= 1
+            raise RuntimeError('Database is down')
+        super().save_data(players_data, heroes_data, skills_data)
+
+
+class WriterTest(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        FlakySQLite.failures = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.database = FlakySQLite(os.path.join(tempdir.name, 'wc.db'))
+        self.addCleanup(self.database.close)
+        self.writer = Writer(self.database, retry_delay=60)
+        self.addCleanup(self._close_writer)
+
+    def _close_writer(self):
+        FlakySQLite.failures = 0
+        self.writer.close()
+
+    def test_failed_data_stays_pending(self):
+        FlakySQLite.failures = 1
+        self.writer.put('1', [('1', 'hero')], [('1', 'hero', 1, 0)], [])
+        self.writer.flush()
+        self.assertTrue(self.writer.has_pending('1'))
+        self.assertEqual(self.writer.failed_transactions, 1)
+
+    def test_failed_data_is_written_on_close(self):
+        FlakySQLite.failures = 1
+        self.writer.put('1', [('1', 'hero')], [('1', 'hero', 1, 0)], [])
+        self.writer.flush()
+        self._close_writer()
+        self.assertFalse(self.writer.has_pending('1'))
+        profile = self.database.load_profile('1')
+        self.assertEqual(profile.active_hero_id, 'hero')
+
+    def test_load_profile_applies_pending_data(self):
+        self.writer.put(
+            '1', [('1', 'hero')], [('1', 'hero', 1, 0)],
+            [('1', 'hero', 'skill', 1)])
+        self.writer.flush()
+        FlakySQLite.failures = 1
+        self.writer.put(
+            '1', [('1', 'other')], [('1', 'hero', 2, 5)],
+            [('1', 'hero', 'skill', 2), ('1', 'other', 'skill', 1)])
+        self.writer.flush()
+        profile = self.database.load_profile('1')
+        self.assertEqual(profile.active_hero_id, 'hero')
+        profile = self.writer.load_profile(self.database, '1')
+        self.assertEqual(profile.active_hero_id, 'other')
+        self.assertEqual(profile.heroes['hero'], (2, 5, {'skill': 2}))
+        self.assertEqual(profile.heroes['other'].skills, {'skill': 1})
+
+
+class _Writer:
+    """Writer stand-in with a fixed set of pending SteamIDs."""
+
+    def __init__(self):
+        self.pending = set()
+
+    def has_pending(self, steamid):
+        return steamid in self.pending
+
+
+class ProfileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.writer = _Writer()
+        self.cache = ProfileCache(self.writer, max_size=2)
+
+    def test_evicts_least_recent(self):
+        for steamid in '123':
+            self.cache.put(Profile(steamid, None, {}))
+        self.assertNotIn('1', self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_keeps_profiles_with_pending_data(self):
+        self.writer.pending.add('1')
+        for steamid in '123':
+            self.cache.put(Profile(steamid, None, {}))
+        self.assertIn('1', self.cache)
+        self.assertNotIn('2', self.cache)
+        self.writer.pending.clear()
+        self.cache.put(Profile('4', None, {}))
+        self.assertEqual(len(self.cache), 2)
+        self.assertNotIn('1', self.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()